@@ -0,0 +1,460 @@
+# benchmarks/fake_servers.py
+"""
+Local stand-in servers for YouTube Data API, Supadata, OpenAI and X.
+
+Each fake runs on its own port with configurable latency, error rate and rate-limit behavior,
+so the pipeline can be load-tested without touching live services.
+
+Run standalone:
+    python -m benchmarks.fake_servers --channels 20 --videos-per-channel 5000
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+PAGE_SIZE = 50
+THUMBNAIL_BYTES = 60 * 1024
+
+
+@dataclass
+class FakeServiceConfig:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0  # fraction of requests answered with HTTP 500
+    rate_limit: float = 0.0  # requests per second, 0 disables rate limiting
+
+
+@dataclass
+class SyntheticCatalog:
+    channels: int = 10
+    videos_per_channel: int = 1000
+    transcript_words: int = 1500
+
+    def channel_handle(self, index):
+        return f"bench{index}"
+
+    def channel_url(self, index):
+        return f"https://www.youtube.com/@{self.channel_handle(index)}"
+
+    def channel_id(self, index):
+        return f"UCbench{index:06d}"
+
+    def channel_index(self, channel_id):
+        """Return the channel index for a channel or uploads playlist ID, or None."""
+        for prefix in ("UCbench", "UUbench"):
+            if channel_id.startswith(prefix):
+                try:
+                    index = int(channel_id[len(prefix):])
+                except ValueError:
+                    return None
+                return index if 0 <= index < self.channels else None
+        return None
+
+    def video_id(self, channel_index, position):
+        return f"b{channel_index:04d}v{position:07d}"
+
+
+class _Behavior:
+    """Applies latency, injected errors and a token-bucket rate limit to each request."""
+
+    def __init__(self, config):
+        self.config = config
+        self._lock = threading.Lock()
+        self._tokens = config.rate_limit
+        self._last_refill = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+
+    def _take_token(self):
+        if not self.config.rate_limit:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.config.rate_limit,
+                self._tokens + (now - self._last_refill) * self.config.rate_limit
+            )
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def apply(self):
+        """Return an HTTP error status to send instead of a normal response, or None."""
+        with self._lock:
+            self.requests += 1
+        delay = self.config.latency_ms + random.uniform(0, self.config.jitter_ms)
+        if delay:
+            time.sleep(delay / 1000.0)
+        if not self._take_token():
+            with self._lock:
+                self.throttled += 1
+            return 429
+        if self.config.error_rate and random.random() < self.config.error_rate:
+            with self._lock:
+                self.errors += 1
+            return 500
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "errors": self.errors, "throttled": self.throttled}
+
+
+class _FakeHandler(BaseHTTPRequestHandler):
+    server_version = "FakeService/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_bytes(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _form_params(self, body):
+        """Simple fields of a urlencoded or multipart form body (file parts are ignored)."""
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("application/x-www-form-urlencoded"):
+            return {key: values[0] for key, values in parse_qs(body.decode("utf-8", "replace")).items()}
+        if content_type.startswith("multipart/form-data"):
+            return {
+                name.decode(): value.decode("utf-8", "replace")
+                for name, value in re.findall(rb'name="(\w+)"\r\n\r\n([^\r]*)\r\n', body)
+            }
+        return {}
+
+    def _handle(self, method):
+        body = self._read_body() if method == "POST" else b""
+        status = self.server.behavior.apply()
+        if status == 429:
+            reset = str(int(time.time()) + 1)
+            self._send_json(429, {"error": "rate limited"}, {
+                "x-rate-limit-limit": "0",
+                "x-rate-limit-remaining": "0",
+                "x-rate-limit-reset": reset,
+                "Retry-After": "1",
+            })
+            return
+        if status:
+            self._send_json(status, {"error": "injected failure"})
+            return
+        parsed = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        params.update(self._form_params(body))
+        result = self.server.route(method, parsed.path, params)
+        if result is None:
+            self._send_json(404, {"error": f"no fake route for {method} {parsed.path}"})
+        elif isinstance(result[1], bytes):
+            self._send_bytes(result[0], result[1], "image/jpeg")
+        else:
+            self._send_json(*result)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, config, catalog, port=0):
+        super().__init__(("127.0.0.1", port), _FakeHandler)
+        self.behavior = _Behavior(config)
+        self.catalog = catalog
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def route(self, method, path, params):
+        raise NotImplementedError
+
+    def stats(self):
+        return self.behavior.stats()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class FakeYouTubeServer(FakeServer):
+    """
+    Serves `channels` and `playlistItems` for the synthetic catalog under /youtube/v3, and thumbnails
+    under /vi/{video_id}/ like i.ytimg.com (maxresdefault is missing for every other video).
+    """
+
+    def route(self, method, path, params):
+        catalog = self.catalog
+        if path.startswith("/vi/"):
+            _, _, video_id, name = path.split("/", 3)
+            if name == "maxresdefault.jpg" and sum(video_id.encode()) % 2:
+                return 404, {"error": "not found"}
+            # Not a real image; the fake X upload doesn't decode it
+            return 200, b"\xff\xd8\xff\xe0" + random.Random(video_id).randbytes(THUMBNAIL_BYTES) + b"\xff\xd9"
+        if path == "/youtube/v3/channels":
+            if "forHandle" in params:
+                handle = params["forHandle"]
+                if handle.startswith("bench") and handle[5:].isdigit() and int(handle[5:]) < catalog.channels:
+                    return 200, {"items": [{"id": catalog.channel_id(int(handle[5:]))}]}
+                return 200, {"items": []}
+            items = []
+            for channel_id in params.get("id", "").split(","):
+                index = catalog.channel_index(channel_id)
+                if index is not None:
+                    items.append({
+                        "id": channel_id,
+                        "contentDetails": {"relatedPlaylists": {"uploads": f"UUbench{index:06d}"}}
+                    })
+            return 200, {"items": items}
+        if path == "/youtube/v3/playlistItems":
+            index = catalog.channel_index(params.get("playlistId", ""))
+            if index is None:
+                return 404, {"error": {"message": "playlist not found"}}
+            page_size = min(int(params.get("maxResults", PAGE_SIZE)), PAGE_SIZE)
+            start = int(params.get("pageToken") or 0)
+            end = min(start + page_size, catalog.videos_per_channel)
+            payload = {"items": [
+                {"snippet": {"resourceId": {"videoId": catalog.video_id(index, position)}}}
+                for position in range(start, end)
+            ]}
+            if end < catalog.videos_per_channel:
+                payload["nextPageToken"] = str(end)
+            return 200, payload
+        if path == "/youtube/v3/playlists":
+            return 200, {"items": []}
+        return None
+
+
+class FakeSupadataServer(FakeServer):
+    """Serves /v1/youtube/transcript with a synthetic transcript per video."""
+
+    def route(self, method, path, params):
+        if path != "/v1/youtube/transcript":
+            return None
+        video_id = params.get("videoId", "")
+        rng = random.Random(video_id)
+        words = ["video", "growth", "relationship", "advice", "story", "idea", "money", "habit", "focus", "team"]
+        content = []
+        remaining = self.catalog.transcript_words
+        offset = 0
+        while remaining > 0:
+            chunk = min(remaining, 12)
+            content.append({
+                "text": " ".join(rng.choice(words) for _ in range(chunk)),
+                "offset": offset,
+                "duration": 4000,
+                "lang": "en",
+            })
+            remaining -= chunk
+            offset += 4000
+        return 200, {"lang": "en", "availableLangs": ["en"], "content": content}
+
+
+class FakeOpenAIServer(FakeServer):
+    """Serves /v1/chat/completions with a short canned tweet."""
+
+    def route(self, method, path, params):
+        if method != "POST" or path != "/v1/chat/completions":
+            return None
+        created = int(time.time())
+        return 200, {
+            "id": f"chatcmpl-bench{created}",
+            "object": "chat.completion",
+            "created": created,
+            "model": "bench-model",
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "A short synthetic tweet about a synthetic video."},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 2000, "completion_tokens": 20, "total_tokens": 2020},
+        }
+
+
+class FakeXServer(FakeServer):
+    """Serves the X v2 create-tweet endpoint and the v1.1 chunked media upload (INIT/APPEND/FINALIZE)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._next_id = 1
+        self._id_lock = threading.Lock()
+        self.tweets = 0
+        self.media_uploads = 0
+
+    def _new_id(self):
+        with self._id_lock:
+            tweet_id = self._next_id
+            self._next_id += 1
+        return str(1700000000000000000 + tweet_id)
+
+    def route(self, method, path, params):
+        if method == "POST" and path == "/2/tweets":
+            with self._id_lock:
+                self.tweets += 1
+            return 201, {"data": {"id": self._new_id(), "text": "posted"}}
+        if method == "POST" and path == "/1.1/media/upload.json":
+            command = params.get("command")
+            if command == "INIT":
+                media_id = self._new_id()
+                return 202, {"media_id": int(media_id), "media_id_string": media_id, "expires_after_secs": 86400}
+            if command == "APPEND":
+                return 200, {}
+            if command == "FINALIZE":
+                with self._id_lock:
+                    self.media_uploads += 1
+                media_id = params.get("media_id", "")
+                return 201, {"media_id": int(media_id or 0), "media_id_string": media_id,
+                             "size": int(params.get("total_bytes", 0) or 0), "expires_after_secs": 86400}
+        return None
+
+    def stats(self):
+        with self._id_lock:
+            return {**super().stats(), "tweets": self.tweets, "media_uploads": self.media_uploads}
+
+
+@dataclass
+class FakeServices:
+    youtube: FakeYouTubeServer
+    supadata: FakeSupadataServer
+    openai: FakeOpenAIServer
+    x: FakeXServer
+
+    def env(self):
+        """Environment variables pointing every external client at the fakes."""
+        return {
+            "YOUTUBE_API_KEY": "bench",
+            "YOUTUBE_API_BASE_URL": f"{self.youtube.base_url}/youtube/v3",
+            "YOUTUBE_REQUEST_DELAY": "0",
+            "SUPADATA_API_KEY": "bench",
+            "SUPADATA_BASE_URL": f"{self.supadata.base_url}/v1",
+            "OPENAI_API_KEY": "bench",
+            "OPENAI_BASE_URL": f"{self.openai.base_url}/v1",
+            "X_API_KEY": "bench",
+            "X_API_SECRET": "bench",
+            "X_ACCESS_TOKEN": "bench",
+            "X_ACCESS_TOKEN_SECRET": "bench",
+            "X_API_BASE_URL": self.x.base_url,
+            "THUMBNAIL_BASE_URL": self.youtube.base_url,
+        }
+
+    def servers(self):
+        return {"youtube": self.youtube, "supadata": self.supadata, "openai": self.openai, "x": self.x}
+
+    def stats(self):
+        return {name: server.stats() for name, server in self.servers().items()}
+
+    def stop(self):
+        for server in self.servers().values():
+            server.stop()
+
+
+def start_fake_services(catalog, configs=None, ports=None):
+    """
+    Start all fake services in background threads.
+
+    Args:
+        catalog: SyntheticCatalog served by the fakes
+        configs: Optional dict of service name -> FakeServiceConfig
+        ports: Optional dict of service name -> port (0 picks a free port)
+
+    Returns:
+        FakeServices
+    """
+    configs = configs or {}
+    ports = ports or {}
+    classes = {
+        "youtube": FakeYouTubeServer,
+        "supadata": FakeSupadataServer,
+        "openai": FakeOpenAIServer,
+        "x": FakeXServer,
+    }
+    servers = {
+        name: cls(configs.get(name, FakeServiceConfig()), catalog, ports.get(name, 0)).start()
+        for name, cls in classes.items()
+    }
+    return FakeServices(**servers)
+
+
+def add_service_arguments(parser):
+    parser.add_argument("--channels", type=int, default=10, help="Number of synthetic channels")
+    parser.add_argument("--videos-per-channel", type=int, default=1000, help="Videos per synthetic channel")
+    parser.add_argument("--transcript-words", type=int, default=1500, help="Words per synthetic transcript")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Base latency added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Random extra latency up to this value")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with HTTP 500")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requests per second per service (0 = off)")
+
+
+def configs_from_args(args):
+    config = FakeServiceConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit
+    )
+    return {name: config for name in ("youtube", "supadata", "openai", "x")}
+
+
+def catalog_from_args(args):
+    return SyntheticCatalog(
+        channels=args.channels,
+        videos_per_channel=args.videos_per_channel,
+        transcript_words=args.transcript_words
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run local stand-ins for every external service.")
+    add_service_arguments(parser)
+    parser.add_argument("--base-port", type=int, default=9100, help="youtube, supadata, openai and x use consecutive ports")
+    args = parser.parse_args()
+
+    ports = {name: args.base_port + offset for offset, name in enumerate(("youtube", "supadata", "openai", "x"))}
+    services = start_fake_services(catalog_from_args(args), configs_from_args(args), ports)
+    print("Fake services running. Export these to point the app at them:")
+    for key, value in services.env().items():
+        print(f"{key}={value}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        services.stop()
+
+
+if __name__ == "__main__":
+    main()
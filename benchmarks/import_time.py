@@ -0,0 +1,85 @@
+# benchmarks/import_time.py
+"""
+Cold-start check: measures `import main` with `python -X importtime` in a fresh interpreter.
+
+Fails (exit code 1) if the cumulative import time exceeds --max-ms, or if a module that should be
+loaded lazily (the openai and tweepy SDKs) is imported eagerly, so CI can gate on it.
+
+Usage:
+    python -m benchmarks.import_time --max-ms 1500 --output import_time.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+LAZY_MODULES = ("openai", "tweepy")
+
+
+def parse_importtime(stderr):
+    """Return {module: (self_us, cumulative_us)} from `-X importtime` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            modules[name.strip()] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue
+    return modules
+
+
+def measure(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure and gate the app's import time.")
+    parser.add_argument("--module", default="main", help="Module to import")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure; the median is used")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if the median import time exceeds this")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to report")
+    parser.add_argument("--output", help="Write the JSON result to this file")
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    totals_ms = [run[args.module][1] / 1000 for run in runs]
+    median_ms = statistics.median(totals_ms)
+    last = runs[-1]
+    slowest = sorted(last.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    eager = [name for name in LAZY_MODULES if name in last]
+
+    result = {
+        "module": args.module,
+        "python": sys.version.split()[0],
+        "runs_ms": [round(t, 2) for t in totals_ms],
+        "median_ms": round(median_ms, 2),
+        "max_ms": args.max_ms,
+        "eager_lazy_modules": eager,
+        "slowest_self_ms": {name: round(self_us / 1000, 2) for name, (self_us, _) in slowest},
+    }
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+    failed = False
+    if eager:
+        print(f"FAIL: {', '.join(eager)} imported eagerly by `import {args.module}`", file=sys.stderr)
+        failed = True
+    if args.max_ms is not None and median_ms > args.max_ms:
+        print(f"FAIL: median import time {median_ms:.1f} ms exceeds {args.max_ms} ms", file=sys.stderr)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
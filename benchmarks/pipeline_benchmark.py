@@ -0,0 +1,236 @@
+# benchmarks/pipeline_benchmark.py
+"""
+End-to-end throughput benchmark for the YouTube-to-X pipeline.
+
+Starts the local fake services, points every external client at them, drives discovery,
+transcript extraction, tweet generation, thumbnail upload and posting over a synthetic catalog, and reports
+throughput and p50/p95/p99 latency per stage. Results are saved as JSON so runs can be compared.
+
+Usage:
+    python -m benchmarks.pipeline_benchmark --channels 20 --videos-per-channel 5000 --output bench.json
+    python -m benchmarks.pipeline_benchmark --output new.json --compare bench.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks.fake_servers import add_service_arguments, catalog_from_args, configs_from_args, start_fake_services
+
+STAGES = ["discovery", "db_insert", "transcript", "generate", "media", "post", "db_update"]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+        self.errors = {stage: 0 for stage in STAGES}
+        self.items = {stage: 0 for stage in STAGES}
+
+    def record(self, stage, seconds, ok=True, items=1):
+        self.samples[stage].append(seconds)
+        self.items[stage] += items
+        if not ok:
+            self.errors[stage] += 1
+
+    def summary(self):
+        result = {}
+        for stage in STAGES:
+            samples = sorted(self.samples[stage])
+            total = sum(samples)
+            result[stage] = {
+                "calls": len(samples),
+                "items": self.items[stage],
+                "errors": self.errors[stage],
+                "total_s": round(total, 4),
+                "throughput_per_s": round(self.items[stage] / total, 2) if total else None,
+                "p50_ms": _ms(percentile(samples, 50)),
+                "p95_ms": _ms(percentile(samples, 95)),
+                "p99_ms": _ms(percentile(samples, 99)),
+            }
+        return result
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_pipeline(catalog, process_limit, timer):
+    """Drive every pipeline stage the same way the API endpoints do."""
+    # Imported here so the fake service environment is in place before module-level config is read
+    import clients
+    import database
+    import logging_setup
+    import media
+    import resilience
+    from youtube import extract_transcript
+    from openai_handler import generate_tweet
+    from x_handler import post_tweet
+
+    # Per-video INFO logs would dominate the run; LOG_LEVEL still overrides this
+    logging_setup.setup_logging()
+    database.init_db()
+    extractor = clients.get("youtube")
+
+    # Discovery: resolve each channel and page through its uploads, then store new videos
+    for index in range(catalog.channels):
+        channel_url = catalog.channel_url(index)
+        channel_id = database.add_channel(catalog.channel_handle(index), channel_url)
+
+        start = time.perf_counter()
+        try:
+            video_urls = extractor.get_all_video_URLs(channel_url)
+        except resilience.ServiceUnavailable:
+            video_urls = []
+        timer.record("discovery", time.perf_counter() - start, ok=bool(video_urls), items=len(video_urls))
+
+        existing = set(database.get_video_urls_by_channel_id(channel_id))
+        for video_url in video_urls:
+            if video_url in existing:
+                continue
+            start = time.perf_counter()
+            database.add_video(channel_id, video_url)
+            timer.record("db_insert", time.perf_counter() - start)
+
+    # Generation and posting for a bounded slice of the pending backlog
+    pending = database.list_videos(status='pending', limit=process_limit, columns=('video_url',))
+    for video in pending:
+        start = time.perf_counter()
+        transcript = extract_transcript(video['video_url'])
+        timer.record("transcript", time.perf_counter() - start, ok=bool(transcript))
+        if not transcript:
+            continue
+
+        start = time.perf_counter()
+        tweet_text = generate_tweet(transcript)
+        timer.record("generate", time.perf_counter() - start, ok=bool(tweet_text))
+        if not tweet_text:
+            continue
+
+        start = time.perf_counter()
+        database.update_video_transcript(video['id'], transcript, tweet_text)
+        timer.record("db_update", time.perf_counter() - start)
+
+        # Thumbnail fetch and chunked upload, as /generate-tweets does once a tweet is generated
+        start = time.perf_counter()
+        media_id = media.prepare_media(video['id'], video['video_url'])
+        timer.record("media", time.perf_counter() - start, ok=bool(media_id))
+
+        start = time.perf_counter()
+        try:
+            success = post_tweet(tweet_text, media_id=media_id)
+        except resilience.ServiceUnavailable:
+            # Left pending, as the /post-to-x endpoint does
+            timer.record("post", time.perf_counter() - start, ok=False)
+            continue
+        timer.record("post", time.perf_counter() - start, ok=success)
+
+        start = time.perf_counter()
+        database.update_video_status(video['id'], 'published' if success else 'error')
+        timer.record("db_update", time.perf_counter() - start)
+
+
+def compare(current, baseline):
+    """Print per-stage throughput and p95 changes against a previous result file."""
+    print(f"\nComparison against {baseline.get('revision') or 'baseline'} ({baseline.get('timestamp')}):")
+    print(f"{'stage':<12}{'throughput':>22}{'p95 ms':>24}")
+    for stage in STAGES:
+        now = current["stages"].get(stage, {})
+        before = baseline.get("stages", {}).get(stage, {})
+        print(
+            f"{stage:<12}"
+            f"{_change(before.get('throughput_per_s'), now.get('throughput_per_s')):>22}"
+            f"{_change(before.get('p95_ms'), now.get('p95_ms')):>24}"
+        )
+
+
+def _change(before, now):
+    if before is None or now is None:
+        return f"{before} -> {now}"
+    if not before:
+        return f"{before} -> {now}"
+    return f"{before} -> {now} ({(now - before) / before * 100:+.1f}%)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the full pipeline against local fake services.")
+    add_service_arguments(parser)
+    parser.add_argument("--process", type=int, default=1000,
+                        help="Pending videos pushed through transcript, generation and posting")
+    parser.add_argument("--output", help="Write the JSON result to this file")
+    parser.add_argument("--compare", help="Previous JSON result to compare against")
+    args = parser.parse_args()
+
+    catalog = catalog_from_args(args)
+    services = start_fake_services(catalog, configs_from_args(args))
+    workdir = tempfile.mkdtemp(prefix="yt2x-bench-")
+    os.environ.update(services.env())
+    os.environ["DATABASE_PATH"] = os.path.join(workdir, "bench.db")
+    os.environ["THUMBNAIL_CACHE_DIR"] = os.path.join(workdir, "thumbnails")
+    os.environ.setdefault("TRACE_DB_PATH", os.path.join(workdir, "traces.db"))
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    timer = StageTimer()
+    started = time.perf_counter()
+    try:
+        run_pipeline(catalog, args.process, timer)
+    finally:
+        elapsed = time.perf_counter() - started
+        services.stop()
+
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": {
+            "channels": args.channels,
+            "videos_per_channel": args.videos_per_channel,
+            "total_videos": args.channels * args.videos_per_channel,
+            "transcript_words": args.transcript_words,
+            "process": args.process,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate,
+            "rate_limit": args.rate_limit,
+        },
+        "wall_time_s": round(elapsed, 3),
+        "stages": timer.summary(),
+        "fake_services": services.stats(),
+    }
+
+    print(json.dumps(result["stages"], indent=2))
+    print(f"Wall time: {result['wall_time_s']}s")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved results to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
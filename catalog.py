@@ -0,0 +1,167 @@
+# catalog.py
+"""
+Streaming NDJSON export and import of the channel and video catalog, optionally gzip-compressed.
+
+One JSON object per line: all channels first, then all videos, which reference their channel by URL so
+ids don't need to match between instances:
+
+    {"type": "channel", "x_handle": "relationship", "channel_url": "https://www.youtube.com/@CaseyZander"}
+    {"type": "video", "channel_url": "https://www.youtube.com/@CaseyZander", "video_url": "...", ...}
+
+Both directions stream from and to the database cursor, so memory stays flat however large the catalog is,
+and importing needs no YouTube API calls.
+
+Usage:
+    python -m catalog export catalog.ndjson.gz [--transcripts]
+    python -m catalog import catalog.ndjson.gz
+"""
+import argparse
+import gzip
+import io
+import json
+import sys
+import zlib
+
+import clients
+
+# Load .env before database reads DATABASE_PATH
+clients.load_env()
+
+import dedup
+from database import init_db, import_catalog, iter_catalog_channels, iter_catalog_videos
+
+IMPORT_CHUNK_SIZE = 5000
+_REQUIRED_FIELDS = {"channel": ("x_handle", "channel_url"), "video": ("channel_url", "video_url")}
+# Stored as text; anything else would only fail inside sqlite
+_TEXT_FIELDS = ("x_handle", "channel_url", "video_url", "title", "transcript", "tweet_text", "tweet_media",
+                "posted_status", "created_at", "updated_at")
+_GZIP_MAGIC = b"\x1f\x8b"
+# Built once; json.dumps with non-default options builds an encoder per call
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def iter_export_lines(include_transcripts=False):
+    """Yield the catalog as NDJSON lines (bytes)."""
+    for x_handle, channel_url in iter_catalog_channels():
+        yield _dump({"type": "channel", "x_handle": x_handle, "channel_url": channel_url})
+    for video in iter_catalog_videos(include_transcripts):
+        yield _dump({"type": "video", **video})
+
+
+def _dump(record):
+    return (_encoder.encode(record) + "\n").encode("utf-8")
+
+
+def iter_export(include_transcripts=False, compress=False, chunk_bytes=64 * 1024):
+    """Yield the NDJSON export in chunks of about `chunk_bytes`, gzip-compressed if `compress`."""
+    # Level 1: the export is CPU-bound and NDJSON compresses well even at the fastest level; wbits 31: gzip container
+    compressor = zlib.compressobj(1, zlib.DEFLATED, 31) if compress else None
+    buffer = []
+    size = 0
+    for line in iter_export_lines(include_transcripts):
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            data = b"".join(buffer)
+            buffer, size = [], 0
+            data = compressor.compress(data) if compressor else data
+            if data:
+                yield data
+    data = b"".join(buffer)
+    if compressor:
+        data = compressor.compress(data) + compressor.flush()
+    if data:
+        yield data
+
+
+def iter_records(fileobj):
+    """
+    Parse NDJSON records from a binary file object, gunzipping transparently.
+
+    Raises:
+        ValueError: A line is not valid JSON, or a record is missing a required field or has a non-string one
+    """
+    if hasattr(fileobj, "peek"):
+        stream = fileobj
+        magic = stream.peek(2)[:2]
+    elif fileobj.seekable():
+        stream = fileobj
+        magic = stream.read(2)
+        stream.seek(0)
+    else:
+        stream = io.BufferedReader(fileobj)
+        magic = stream.peek(2)[:2]
+    if magic == _GZIP_MAGIC:
+        stream = gzip.GzipFile(fileobj=stream, mode="rb")
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Line {number}: invalid JSON: {e}")
+        if not isinstance(record, dict):
+            raise ValueError(f"Line {number}: expected an object")
+        required = _REQUIRED_FIELDS.get(record.get("type"))
+        if required is None:
+            raise ValueError(f"Line {number}: unknown record type {record.get('type')!r}")
+        missing = [field for field in required if not record.get(field)]
+        if missing:
+            raise ValueError(f"Line {number}: missing {', '.join(missing)}")
+        mistyped = [field for field in _TEXT_FIELDS if not isinstance(record.get(field), (str, type(None)))]
+        if mistyped:
+            raise ValueError(f"Line {number}: {', '.join(mistyped)} must be a string or null")
+        yield record
+
+
+def import_file(fileobj, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Import an NDJSON (or gzipped NDJSON) catalog in one transaction; nothing is imported if any line is invalid.
+    Imported transcripts get their near-duplicate signatures. Returns the counts from database.import_catalog().
+
+    Raises:
+        ValueError: The file is not valid (gzipped) NDJSON, or a video has an unknown posted_status
+    """
+    try:
+        return import_catalog(iter_records(fileobj), chunk_size, signature=dedup.signature_of)
+    except (EOFError, zlib.error, gzip.BadGzipFile) as e:
+        raise ValueError(f"Invalid gzip data: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import the channel and video catalog as NDJSON.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Write the catalog to a file ('-' for stdout)")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--transcripts", action="store_true", help="Include transcripts")
+    export_parser.add_argument("--gzip", action="store_true", help="Compress (default when the path ends in .gz)")
+    import_parser = subparsers.add_parser("import", help="Load a catalog file ('-' for stdin), skipping duplicates")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    init_db()
+    if args.command == "export":
+        compress = args.gzip or args.path.endswith(".gz")
+        out = sys.stdout.buffer if args.path == "-" else open(args.path, "wb")
+        try:
+            for chunk in iter_export(args.transcripts, compress):
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+    else:
+        source = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+        try:
+            stats = import_file(source, args.chunk_size)
+        except ValueError as e:
+            print(f"Import failed, nothing imported: {e}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+        print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
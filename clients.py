@@ -0,0 +1,54 @@
+# clients.py
+"""
+Shared registry of external clients.
+
+Modules register a factory for each client they own; the client is built on first use and reused
+afterwards, so importing the app (e.g. for a process that only serves /status) does not construct
+clients or import heavy SDKs such as openai and tweepy.
+"""
+import threading
+
+from dotenv import load_dotenv
+
+_env_loaded = False
+_factories = {}
+_instances = {}
+_lock = threading.Lock()
+
+
+def load_env():
+    """Load .env into the environment once per process."""
+    global _env_loaded
+    if not _env_loaded:
+        load_dotenv()
+        _env_loaded = True
+
+
+def register(name, factory):
+    """Register the factory building client `name`. Re-registering drops any built instance."""
+    with _lock:
+        _factories[name] = factory
+        _instances.pop(name, None)
+
+
+def get(name):
+    """Return client `name`, building it on first use."""
+    client = _instances.get(name)
+    if client is not None:
+        return client
+    with _lock:
+        client = _instances.get(name)
+        if client is None:
+            if name not in _factories:
+                raise KeyError(f"No client registered as '{name}'")
+            client = _instances[name] = _factories[name]()
+        return client
+
+
+def reset(name=None):
+    """Drop built clients (all, or one) so the next get() rebuilds them, e.g. after config changes."""
+    with _lock:
+        if name is None:
+            _instances.clear()
+        else:
+            _instances.pop(name, None)
@@ -0,0 +1,340 @@
+# coordination.py
+"""
+Multi-node coordination: sharded channel ownership with leases.
+
+Channels are hash-partitioned into COORDINATION_SHARDS shards (crc32 of the channel URL). Every node
+heartbeats into a shared store, renews the leases on the shards it holds and rebalances towards a fair
+share of the live nodes: shards of a node that stops heartbeating expire and are picked up by the others,
+and a node holding more than its share hands the extra shards back when a new node joins. Scans only
+cover channels of owned shards. Individual videos are claimed in the videos table (see
+database.claim_video), so a video is never generated or posted by two nodes at once.
+
+Claims, like the videos themselves, live in the main database, so all nodes must use the same one. Each
+node registers the random ID of its database (database.get_database_id); a node whose database differs
+from that of the longest-registered node is refused shards until it is pointed at the shared database.
+
+The lease store is a SQLite file shared by all nodes (COORDINATION_DB_PATH, the main database by default)
+or Postgres when COORDINATION_URL is a postgres:// URL (requires psycopg).
+
+Config:
+    COORDINATION_ENABLED=false      without it this node owns every shard
+    COORDINATION_URL=               postgresql://... to use Postgres
+    COORDINATION_DB_PATH=           shared SQLite file, defaults to DATABASE_PATH
+    COORDINATION_SHARDS=64
+    COORDINATION_LEASE_TTL=30       seconds a lease or heartbeat stays valid
+    COORDINATION_HEARTBEAT_INTERVAL=10
+    NODE_ID=                        defaults to hostname-pid
+"""
+import logging
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+import database
+import metrics
+
+logger = logging.getLogger(__name__)
+
+COORDINATION_ENABLED = os.getenv("COORDINATION_ENABLED", "false").lower() == "true"
+COORDINATION_URL = os.getenv("COORDINATION_URL", "")
+COORDINATION_DB_PATH = os.getenv("COORDINATION_DB_PATH") or os.getenv("DATABASE_PATH", "youtube_to_x.db")
+COORDINATION_SHARDS = int(os.getenv("COORDINATION_SHARDS", 64))
+COORDINATION_LEASE_TTL = float(os.getenv("COORDINATION_LEASE_TTL", 30))
+COORDINATION_HEARTBEAT_INTERVAL = float(os.getenv("COORDINATION_HEARTBEAT_INTERVAL", 10))
+NODE_ID = os.getenv("NODE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS coordination_nodes (
+        node_id TEXT PRIMARY KEY,
+        started_at DOUBLE PRECISION NOT NULL,
+        heartbeat_at DOUBLE PRECISION NOT NULL,
+        database_id TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS shard_leases (
+        shard INTEGER PRIMARY KEY,
+        node_id TEXT,
+        expires_at DOUBLE PRECISION NOT NULL DEFAULT 0
+    )
+    """,
+]
+
+
+class SQLiteBackend:
+    """Coordination tables in a SQLite file shared by all nodes."""
+
+    placeholder = "?"
+
+    def __init__(self, path):
+        self.path = path
+
+    def add_column(self, conn, table, column, definition):
+        """Add a column to a table created before it existed."""
+        if column not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    @contextmanager
+    def transaction(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            # Take the write lock up front so read-then-write sequences are atomic across nodes
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+
+class PostgresBackend:
+    """Coordination tables in Postgres; psycopg is imported only when this backend is used."""
+
+    placeholder = "%s"
+
+    def __init__(self, url):
+        self.url = url
+
+    def add_column(self, conn, table, column, definition):
+        """Add a column to a table created before it existed."""
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {definition}")
+
+    @contextmanager
+    def transaction(self):
+        import psycopg
+
+        with psycopg.connect(self.url) as conn:
+            yield conn
+
+
+class Coordinator:
+    def __init__(self, backend, node_id, shards, lease_ttl, database_id=None):
+        self.backend = backend
+        self.node_id = node_id
+        self.shards = shards
+        self.lease_ttl = lease_ttl
+        self.database_id = database_id
+        # Owned shards and the time their leases run out, replaced together
+        self._lease = (frozenset(), 0.0)
+        self._initialized = False
+
+    def _execute(self, conn, sql, params=()):
+        return conn.execute(sql.replace("?", self.backend.placeholder), params)
+
+    def _init(self, conn):
+        for statement in _SCHEMA:
+            self._execute(conn, statement)
+        self.backend.add_column(conn, "coordination_nodes", "database_id", "TEXT")
+        self._execute(conn, "CREATE INDEX IF NOT EXISTS idx_shard_leases_node_id ON shard_leases (node_id)")
+        existing = {row[0] for row in self._execute(conn, "SELECT shard FROM shard_leases").fetchall()}
+        for shard in range(self.shards):
+            if shard not in existing:
+                self._execute(
+                    conn, "INSERT INTO shard_leases (shard, node_id, expires_at) VALUES (?, NULL, 0) "
+                          "ON CONFLICT (shard) DO NOTHING", (shard,)
+                )
+        self._initialized = True
+
+    @property
+    def owned_shards(self):
+        """Shards leased by this node; empty once the leases expired without a successful heartbeat."""
+        owned, expires_at = self._lease
+        return owned if time.time() < expires_at else frozenset()
+
+    def heartbeat(self):
+        """
+        Record this node as alive, renew its leases, release shards above its fair share and acquire
+        free or expired shards up to it. Returns the set of shards owned afterwards.
+        """
+        now = time.time()
+        expires_at = now + self.lease_ttl
+        with self.backend.transaction() as conn:
+            if not self._initialized:
+                self._init(conn)
+            self._execute(
+                conn, "INSERT INTO coordination_nodes (node_id, started_at, heartbeat_at, database_id) "
+                      "VALUES (?, ?, ?, ?) ON CONFLICT (node_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at, "
+                      "database_id = excluded.database_id",
+                (self.node_id, now, now, self.database_id)
+            )
+            # The longest-registered node's database is the shared one; recently dead nodes count too, so a
+            # misconfigured node can't take over their shards
+            shared_database_id = self._execute(
+                conn, "SELECT database_id FROM coordination_nodes ORDER BY started_at, node_id LIMIT 1"
+            ).fetchone()[0]
+            if shared_database_id != self.database_id:
+                # Claims in a different database would not exclude the other nodes: take no shards at all
+                self._execute(
+                    conn, "UPDATE shard_leases SET node_id = NULL, expires_at = 0 WHERE node_id = ?", (self.node_id,)
+                )
+                owned = []
+                live_nodes = None
+            else:
+                live_nodes = self._execute(
+                    conn, "SELECT COUNT(*) FROM coordination_nodes "
+                          "WHERE heartbeat_at > ? AND COALESCE(database_id, '') = ?",
+                    (now - self.lease_ttl, self.database_id or "")
+                ).fetchone()[0]
+                owned = self._acquire(conn, now, expires_at, math.ceil(self.shards / max(1, live_nodes)))
+
+            # Forget nodes that stopped heartbeating long ago
+            self._execute(
+                conn, "DELETE FROM coordination_nodes WHERE heartbeat_at < ?", (now - 10 * self.lease_ttl,)
+            )
+
+        if live_nodes is None:
+            logger.error(
+                f"Node {self.node_id} uses database {self.database_id}, other nodes use {shared_database_id}; "
+                f"DATABASE_PATH must point at the database shared by all nodes. Not taking any shards."
+            )
+        elif set(owned) != self._lease[0]:
+            logger.info(f"Node {self.node_id} owns {len(owned)}/{self.shards} shards ({live_nodes} live nodes)")
+        self._lease = (frozenset(owned), expires_at)
+        return self._lease[0]
+
+    def _acquire(self, conn, now, expires_at, fair_share):
+        """Renew this node's leases and move towards `fair_share` shards. Returns the shards owned."""
+        self._execute(
+            conn, "UPDATE shard_leases SET expires_at = ? WHERE node_id = ? AND expires_at > ?",
+            (expires_at, self.node_id, now)
+        )
+        owned = [row[0] for row in self._execute(
+            conn, "SELECT shard FROM shard_leases WHERE node_id = ? AND expires_at > ? ORDER BY shard",
+            (self.node_id, now)
+        ).fetchall()]
+
+        if len(owned) > fair_share:
+            # Hand back the surplus so newly joined nodes can pick it up on their next heartbeat
+            for shard in owned[fair_share:]:
+                self._execute(
+                    conn, "UPDATE shard_leases SET node_id = NULL, expires_at = 0 WHERE shard = ? AND node_id = ?",
+                    (shard, self.node_id)
+                )
+            owned = owned[:fair_share]
+        elif len(owned) < fair_share:
+            free = [row[0] for row in self._execute(
+                conn, "SELECT shard FROM shard_leases WHERE node_id IS NULL OR expires_at <= ? ORDER BY shard",
+                (now,)
+            ).fetchall()]
+            for shard in free[:fair_share - len(owned)]:
+                claimed = self._execute(
+                    conn, "UPDATE shard_leases SET node_id = ?, expires_at = ? "
+                          "WHERE shard = ? AND (node_id IS NULL OR expires_at <= ?)",
+                    (self.node_id, expires_at, shard, now)
+                ).rowcount
+                if claimed:
+                    owned.append(shard)
+        return owned
+
+    def leave(self):
+        """Release all leases and deregister, so the remaining nodes take over without waiting for expiry."""
+        with self.backend.transaction() as conn:
+            if not self._initialized:
+                self._init(conn)
+            self._execute(
+                conn, "UPDATE shard_leases SET node_id = NULL, expires_at = 0 WHERE node_id = ?", (self.node_id,)
+            )
+            self._execute(conn, "DELETE FROM coordination_nodes WHERE node_id = ?", (self.node_id,))
+        self._lease = (frozenset(), 0.0)
+
+    def get_state(self):
+        """Live nodes and the current lease holder of every shard."""
+        now = time.time()
+        with self.backend.transaction() as conn:
+            if not self._initialized:
+                self._init(conn)
+            nodes = self._execute(
+                conn, "SELECT node_id, started_at, heartbeat_at, database_id FROM coordination_nodes ORDER BY node_id"
+            ).fetchall()
+            leases = self._execute(
+                conn, "SELECT node_id, COUNT(*) FROM shard_leases WHERE expires_at > ? GROUP BY node_id", (now,)
+            ).fetchall()
+        shards_by_node = dict(leases)
+        return {
+            "node_id": self.node_id,
+            "shards": self.shards,
+            "owned_shards": sorted(self.owned_shards),
+            "nodes": [
+                {"node_id": node_id, "started_at": started_at, "heartbeat_at": heartbeat_at,
+                 "alive": heartbeat_at > now - self.lease_ttl, "shards": shards_by_node.get(node_id, 0),
+                 "database_id": database_id}
+                for node_id, started_at, heartbeat_at, database_id in nodes
+            ],
+            "unowned_shards": self.shards - sum(shards_by_node.values()),
+        }
+
+
+def _build_backend():
+    if COORDINATION_URL.startswith(("postgres://", "postgresql://")):
+        return PostgresBackend(COORDINATION_URL)
+    return SQLiteBackend(COORDINATION_DB_PATH)
+
+
+coordinator = Coordinator(_build_backend(), NODE_ID, COORDINATION_SHARDS, COORDINATION_LEASE_TTL)
+
+_stop = threading.Event()
+_thread = None
+
+metrics.register_gauge(
+    "coordination_owned_shards",
+    "Channel shards currently leased by this node.",
+    (),
+    lambda: {(): len(coordinator.owned_shards) if COORDINATION_ENABLED else COORDINATION_SHARDS}
+)
+
+
+def shard_for_channel(channel_url):
+    return zlib.crc32(channel_url.encode("utf-8")) % COORDINATION_SHARDS
+
+
+def owns_channel(channel_url):
+    """Whether this node should scan the channel. Always true when coordination is disabled."""
+    if not COORDINATION_ENABLED:
+        return True
+    return shard_for_channel(channel_url) in coordinator.owned_shards
+
+
+def _run():
+    while not _stop.wait(COORDINATION_HEARTBEAT_INTERVAL):
+        try:
+            coordinator.heartbeat()
+        except Exception as e:
+            # Leases are only renewed by heartbeats; after lease_ttl without one the shards move elsewhere
+            logger.error(f"Coordination heartbeat failed: {e}")
+
+
+def start():
+    """Take the initial shard leases and keep heartbeating in a background thread."""
+    global _thread
+    if not COORDINATION_ENABLED or _thread is not None:
+        return
+    coordinator.database_id = database.get_database_id()
+    try:
+        coordinator.heartbeat()
+    except Exception as e:
+        logger.error(f"Initial coordination heartbeat failed: {e}")
+    _stop.clear()
+    _thread = threading.Thread(target=_run, name="coordination-heartbeat", daemon=True)
+    _thread.start()
+
+
+def stop():
+    global _thread
+    if _thread is None:
+        return
+    _stop.set()
+    _thread.join(timeout=COORDINATION_HEARTBEAT_INTERVAL)
+    _thread = None
+    try:
+        coordinator.leave()
+    except Exception as e:
+        logger.error(f"Failed to release shard leases: {e}")
@@ -1,9 +1,26 @@
 # database.py
 import sqlite3
 import os
+import logging
+import time
+import uuid
+import zlib
 from datetime import datetime
 
+from metrics import timed_query
+
+logger = logging.getLogger(__name__)
+
 DB_PATH = os.getenv("DATABASE_PATH", "youtube_to_x.db")
+TRANSCRIPT_ARCHIVE_LEVEL = int(os.getenv("TRANSCRIPT_ARCHIVE_LEVEL", 6))  # zlib compression level
+
+# Columns list_videos() may return; the transcript is only read when asked for
+VIDEO_COLUMNS = ("id", "channel_id", "video_url", "title", "transcript", "tweet_text", "tweet_media", "posted_status",
+                 "claimed_by", "claimed_at", "created_at", "updated_at")
+DEFAULT_VIDEO_COLUMNS = tuple(c for c in VIDEO_COLUMNS if c != "transcript")
+VIDEO_STATUSES = ("pending", "error", "published", "duplicate")
+# Claim statuses are node-local; outside the claiming node they resolve as release_stale_claims() does
+RELEASED_CLAIM_STATUSES = {"generating": "pending", "posting": "error"}
 
 
 def get_db():
@@ -12,6 +29,8 @@ def get_db():
 
 def init_db():
     with get_db() as conn:
+        # Only takes effect on a new database; existing ones are converted by incremental_vacuum()
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
         conn.execute("""
             CREATE TABLE IF NOT EXISTS channels (
                 id INTEGER PRIMARY KEY,
@@ -33,8 +52,49 @@ def init_db():
                 updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         """)
+        # Multi-node claims (see claim_video); added in place on databases created before them
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(videos)").fetchall()}
+        if "claimed_by" not in columns:
+            conn.execute("ALTER TABLE videos ADD COLUMN claimed_by TEXT")
+        if "claimed_at" not in columns:
+            conn.execute("ALTER TABLE videos ADD COLUMN claimed_at REAL")
+        # Keyset pagination (WHERE ... AND id > ? ORDER BY id) per status or channel; (posted_status, id)
+        # also serves plain status lookups, so it replaces the single-column index
+        conn.execute("DROP INDEX IF EXISTS idx_videos_posted_status")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_videos_status_id ON videos (posted_status, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_videos_channel_id_id ON videos (channel_id, id)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS transcript_signatures (
+                video_id INTEGER PRIMARY KEY,
+                simhash INTEGER NOT NULL,
+                band0 INTEGER NOT NULL,
+                band1 INTEGER NOT NULL,
+                band2 INTEGER NOT NULL,
+                band3 INTEGER NOT NULL,
+                duplicate_of INTEGER
+            )
+        """)
+        for band in range(4):
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_transcript_signatures_band{band} "
+                f"ON transcript_signatures (band{band})"
+            )
+        # Random ID of this database; coordinated nodes compare it to make sure they share one database
+        conn.execute("CREATE TABLE IF NOT EXISTS database_info (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute(
+            "INSERT OR IGNORE INTO database_info (key, value) VALUES ('database_id', ?)", (uuid.uuid4().hex,)
+        )
+        # Cold storage: zlib-compressed transcripts of published videos
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS transcript_archive (
+                video_id INTEGER PRIMARY KEY,
+                transcript BLOB NOT NULL,
+                archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
 
 
+@timed_query("add_channel")
 def add_channel(x_handle, channel_url):
     """Add channel and return channel ID"""
     with get_db() as conn:
@@ -47,32 +107,144 @@ def add_channel(x_handle, channel_url):
         ).fetchone()[0]
 
 
+@timed_query("add_channels_from_list")
 def add_channels_from_list(channel_list):
-    """Add hardcoded channels to DB"""
-    # placeholder
+    """
+    Add many channels in a single transaction.
+
+    Args:
+        channel_list: Iterable of dicts with 'x_handle' and 'channel_url'
+
+    Returns:
+        Dictionary mapping channel_url to channel ID (existing channels keep their ID)
+    """
+    channel_list = list(channel_list)
+    with get_db() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO channels (x_handle, channel_url) VALUES (?, ?)",
+            [(c["x_handle"], c["channel_url"]) for c in channel_list]
+        )
+        ids = {}
+        for c in channel_list:
+            row = conn.execute("SELECT id FROM channels WHERE channel_url = ?", (c["channel_url"],)).fetchone()
+            if row:
+                ids[c["channel_url"]] = row[0]
+        return ids
 
 
+@timed_query("get_all_channels")
 def get_all_channels():
     with get_db() as conn:
         return conn.execute("SELECT * FROM channels").fetchall()
 
 
+@timed_query("add_video")
 def add_video(channel_id, video_url, title=None):
     with get_db() as conn:
         conn.execute(
-            "INSERT INTO videos (channel_id, video_url, title) VALUES (?, ?, ?)",
+            "INSERT OR IGNORE INTO videos (channel_id, video_url, title) VALUES (?, ?, ?)",
             (channel_id, video_url, title)
         )
 
 
-def get_videos_by_status(status):
+@timed_query("add_videos")
+def add_videos(channel_id, video_urls):
+    """Insert many videos of a channel in one transaction, skipping known URLs. Returns the number added."""
+    with get_db() as conn:
+        before = conn.total_changes
+        conn.executemany(
+            "INSERT OR IGNORE INTO videos (channel_id, video_url) VALUES (?, ?)",
+            [(channel_id, video_url) for video_url in video_urls]
+        )
+        return conn.total_changes - before
+
+
+@timed_query("get_videos_by_status")
+def get_videos_by_status(status, columns=None):
+    """Rows of all videos with the given status; `columns` limits the columns read (default: all)."""
+    projection = ", ".join(resolve_video_columns(columns)) if columns else "*"
     with get_db() as conn:
         conn.row_factory = sqlite3.Row
         return conn.execute(
-            "SELECT * FROM videos WHERE posted_status = ?", (status,)
+            f"SELECT {projection} FROM videos WHERE posted_status = ?", (status,)
         ).fetchall()
 
 
+def resolve_video_columns(columns=None):
+    """
+    Validate a column projection for list_videos(); None selects DEFAULT_VIDEO_COLUMNS. `id` is always included.
+
+    Raises:
+        ValueError: An unknown column was requested
+    """
+    if not columns:
+        return DEFAULT_VIDEO_COLUMNS
+    unknown = [c for c in columns if c not in VIDEO_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+    return tuple(dict.fromkeys(("id", *columns)))
+
+
+def video_page_query(after_id=0, limit=100, status=None, channel_id=None, columns=None):
+    """
+    SQL and parameters for one keyset page of videos, as iter_videos() runs it. Selected columns are those of
+    resolve_video_columns(columns), followed by the archived transcript when `transcript` is requested.
+    """
+    columns = resolve_video_columns(columns)
+    select = [f"v.{c}" for c in columns]
+    join = ""
+    if "transcript" in columns:
+        select.append("a.transcript")
+        join = " LEFT JOIN transcript_archive a ON a.video_id = v.id"
+    where = ["v.id > ?"]
+    params = [after_id]
+    if status is not None:
+        where.append("v.posted_status = ?")
+        params.append(status)
+    if channel_id is not None:
+        where.append("v.channel_id = ?")
+        params.append(channel_id)
+    params.append(limit)
+    sql = f"SELECT {', '.join(select)} FROM videos v{join} WHERE {' AND '.join(where)} ORDER BY v.id LIMIT ?"
+    return sql, params
+
+
+def iter_videos(after_id=0, limit=100, status=None, channel_id=None, columns=None):
+    """
+    Yield up to `limit` videos with id > after_id in id order, as dicts of the requested columns.
+    Keyset pagination: pass the last id seen as after_id for the next page. Rows are read from the cursor
+    as they are consumed, so a large page is never held in memory at once.
+
+    Archived transcripts are decompressed when the transcript column is requested.
+    """
+    columns = resolve_video_columns(columns)
+    with_transcript = "transcript" in columns
+    sql, params = video_page_query(after_id, limit, status, channel_id, columns)
+
+    # Streaming responses may resume the generator on another worker thread
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    try:
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(200)
+            if not rows:
+                break
+            for row in rows:
+                video = dict(zip(columns, row))
+                if with_transcript and video["transcript"] is None and row[-1] is not None:
+                    video["transcript"] = zlib.decompress(row[-1]).decode("utf-8")
+                yield video
+    finally:
+        conn.close()
+
+
+@timed_query("list_videos")
+def list_videos(after_id=0, limit=100, status=None, channel_id=None, columns=None):
+    """One page of videos as a list; see iter_videos()."""
+    return list(iter_videos(after_id, limit, status, channel_id, columns))
+
+
+@timed_query("update_video_transcript")
 def update_video_transcript(video_id, transcript, tweet_text):
     with get_db() as conn:
         conn.execute(
@@ -81,6 +253,25 @@ def update_video_transcript(video_id, transcript, tweet_text):
         )
 
 
+@timed_query("update_video_tweet_text")
+def update_video_tweet_text(video_id, tweet_text):
+    with get_db() as conn:
+        conn.execute(
+            "UPDATE videos SET tweet_text = ? WHERE id = ?",
+            (tweet_text, video_id)
+        )
+
+
+@timed_query("update_video_media")
+def update_video_media(video_id, tweet_media):
+    with get_db() as conn:
+        conn.execute(
+            "UPDATE videos SET tweet_media = ? WHERE id = ?",
+            (tweet_media, video_id)
+        )
+
+
+@timed_query("update_video_status")
 def update_video_status(video_id, status):
     with get_db() as conn:
         conn.execute(
@@ -89,13 +280,68 @@ def update_video_status(video_id, status):
         )
 
 
+def get_database_id():
+    """Random ID created with the database, identifying it across nodes."""
+    with get_db() as conn:
+        return conn.execute("SELECT value FROM database_info WHERE key = 'database_id'").fetchone()[0]
+
+
+@timed_query("claim_video")
+def claim_video(video_id, node_id, claimed_status, from_status='pending'):
+    """
+    Atomically move a video from `from_status` to `claimed_status` for this node (compare-and-set).
+    Returns True if this node got the claim, False if another node changed the video first.
+    Claims only exclude other nodes using the same database, which coordination.py enforces.
+    """
+    with get_db() as conn:
+        return conn.execute(
+            "UPDATE videos SET posted_status = ?, claimed_by = ?, claimed_at = ? WHERE id = ? AND posted_status = ?",
+            (claimed_status, node_id, time.time(), video_id, from_status)
+        ).rowcount == 1
+
+
+@timed_query("release_video_claim")
+def release_video_claim(video_id, node_id, status):
+    """Set the final (or original) status of a video claimed by this node and drop the claim."""
+    with get_db() as conn:
+        conn.execute(
+            "UPDATE videos SET posted_status = ?, claimed_by = NULL, claimed_at = NULL "
+            "WHERE id = ? AND claimed_by = ?",
+            (status, video_id, node_id)
+        )
+
+
+@timed_query("release_stale_claims")
+def release_stale_claims(timeout):
+    """
+    Recover claims of nodes that died mid-way. Stale 'generating' claims return to 'pending'. Stale 'posting'
+    claims become 'error', because the tweet may already have been posted. Returns the number released.
+    """
+    cutoff = time.time() - timeout
+    with get_db() as conn:
+        before = conn.total_changes
+        conn.execute(
+            "UPDATE videos SET posted_status = 'pending', claimed_by = NULL, claimed_at = NULL "
+            "WHERE posted_status = 'generating' AND claimed_at < ?", (cutoff,)
+        )
+        conn.execute(
+            "UPDATE videos SET posted_status = 'error', claimed_by = NULL, claimed_at = NULL "
+            "WHERE posted_status = 'posting' AND claimed_at < ?", (cutoff,)
+        )
+        return conn.total_changes - before
+
+
+@timed_query("get_video_info_by_url")
 def get_video_info_by_url(video_url):
+    """Return the video's row without the transcript, or None. Use get_transcript() for the transcript."""
     with get_db() as conn:
         return conn.execute(
-            "SELECT * FROM videos WHERE video_url = ?", (video_url,)
+            "SELECT id, channel_id, video_url, title, tweet_text, tweet_media, posted_status, created_at, updated_at "
+            "FROM videos WHERE video_url = ?", (video_url,)
         ).fetchone()
 
 
+@timed_query("get_video_urls_by_channel_id")
 def get_video_urls_by_channel_id(channel_id):
     """Return a list of video URLs for the given channel_id."""
     with get_db() as conn:
@@ -104,3 +350,317 @@ def get_video_urls_by_channel_id(channel_id):
             (channel_id,)
         ).fetchall()
         return [row[0] for row in rows]
+
+
+@timed_query("count_videos_by_status")
+def count_videos_by_status():
+    """Return a dict of posted_status -> number of videos."""
+    with get_db() as conn:
+        rows = conn.execute(
+            "SELECT posted_status, COUNT(*) FROM videos GROUP BY posted_status"
+        ).fetchall()
+        return {status: count for status, count in rows}
+
+
+@timed_query("get_video_summary")
+def get_video_summary(video_id):
+    """Return id, video_url, tweet_text and posted_status of a video, without the transcript."""
+    with get_db() as conn:
+        conn.row_factory = sqlite3.Row
+        return conn.execute(
+            "SELECT id, video_url, tweet_text, posted_status FROM videos WHERE id = ?", (video_id,)
+        ).fetchone()
+
+
+def _to_signed64(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+@timed_query("save_transcript_signature")
+def save_transcript_signature(video_id, simhash, bands, duplicate_of=None):
+    with get_db() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO transcript_signatures "
+            "(video_id, simhash, band0, band1, band2, band3, duplicate_of) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (video_id, _to_signed64(simhash), *bands, duplicate_of)
+        )
+
+
+@timed_query("find_signature_candidates")
+def find_signature_candidates(bands, exclude_video_id=None):
+    """
+    Return (video_id, simhash) of stored signatures sharing at least one band, for videos that have a tweet:
+    published, or pending with tweet text. Skipped, failed and not yet generated videos are no originals.
+    """
+    with get_db() as conn:
+        rows = conn.execute(
+            """
+            SELECT s.video_id, s.simhash FROM (
+                SELECT video_id, simhash FROM transcript_signatures WHERE band0 = ?
+                UNION SELECT video_id, simhash FROM transcript_signatures WHERE band1 = ?
+                UNION SELECT video_id, simhash FROM transcript_signatures WHERE band2 = ?
+                UNION SELECT video_id, simhash FROM transcript_signatures WHERE band3 = ?
+            ) s
+            JOIN videos v ON v.id = s.video_id
+            WHERE v.posted_status = 'published'
+               OR (v.posted_status = 'pending' AND v.tweet_text IS NOT NULL AND v.tweet_text != '')
+            """,
+            bands
+        ).fetchall()
+        return [
+            (video_id, simhash & 0xFFFFFFFFFFFFFFFF)
+            for video_id, simhash in rows
+            if video_id != exclude_video_id
+        ]
+
+
+@timed_query("get_transcript")
+def get_transcript(video_id):
+    """Return a video's transcript from the hot table, or lazily from cold storage if archived."""
+    with get_db() as conn:
+        row = conn.execute("SELECT transcript FROM videos WHERE id = ?", (video_id,)).fetchone()
+        if row and row[0]:
+            return row[0]
+        row = conn.execute("SELECT transcript FROM transcript_archive WHERE video_id = ?", (video_id,)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+
+@timed_query("archive_published_transcripts")
+def archive_published_transcripts(batch_size=500):
+    """
+    Move transcripts of published videos into compressed cold storage, one batch per transaction.
+    Returns the number of transcripts archived.
+    """
+    with get_db() as conn:
+        rows = conn.execute(
+            "SELECT id, transcript FROM videos "
+            "WHERE posted_status = 'published' AND transcript IS NOT NULL LIMIT ?",
+            (batch_size,)
+        ).fetchall()
+        if not rows:
+            return 0
+        conn.executemany(
+            "INSERT OR REPLACE INTO transcript_archive (video_id, transcript) VALUES (?, ?)",
+            [(video_id, zlib.compress(transcript.encode("utf-8"), TRANSCRIPT_ARCHIVE_LEVEL))
+             for video_id, transcript in rows]
+        )
+        conn.executemany(
+            "UPDATE videos SET transcript = NULL WHERE id = ?",
+            [(video_id,) for video_id, _ in rows]
+        )
+        return len(rows)
+
+
+@timed_query("sign_unsigned_transcripts")
+def sign_unsigned_transcripts(signature, batch_size=500):
+    """
+    Store transcript_signatures for up to `batch_size` videos that have a transcript (hot or archived)
+    but no signature yet, e.g. ones stored before near-duplicate detection existed. One batch per transaction.
+
+    Args:
+        signature: Function returning (simhash, bands) of a transcript
+
+    Returns:
+        The number of videos signed
+    """
+    with get_db() as conn:
+        rows = conn.execute(
+            "SELECT v.id, v.transcript, a.transcript FROM videos v "
+            "LEFT JOIN transcript_archive a ON a.video_id = v.id "
+            "WHERE (v.transcript IS NOT NULL OR a.transcript IS NOT NULL) "
+            "AND NOT EXISTS (SELECT 1 FROM transcript_signatures s WHERE s.video_id = v.id) "
+            "ORDER BY v.id LIMIT ?",
+            (batch_size,)
+        ).fetchall()
+        signatures = []
+        for video_id, transcript, archived in rows:
+            simhash, bands = signature(transcript or zlib.decompress(archived).decode("utf-8"))
+            signatures.append((video_id, _to_signed64(simhash), *bands))
+        conn.executemany(
+            "INSERT OR REPLACE INTO transcript_signatures (video_id, simhash, band0, band1, band2, band3) "
+            "VALUES (?, ?, ?, ?, ?, ?)", signatures
+        )
+        return len(signatures)
+
+
+@timed_query("incremental_vacuum")
+def incremental_vacuum(max_pages=2000):
+    """
+    Return up to `max_pages` free pages to the filesystem. Databases created before incremental
+    auto-vacuum was enabled are converted once with a full VACUUM.
+    Returns the number of pages freed.
+    """
+    conn = get_db()
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            logger.warning("Converting database to incremental auto-vacuum (one-time full VACUUM)")
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            return 0
+        free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        # executescript steps the pragma to completion; a cursor would free a single page
+        conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages)});")
+        free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return free_before - free_after
+    finally:
+        conn.close()
+
+
+def iter_catalog_channels():
+    """Yield (x_handle, channel_url) of every channel, read from the cursor as consumed."""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    try:
+        cursor = conn.execute("SELECT x_handle, channel_url FROM channels ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+
+def iter_catalog_videos(include_transcripts=False):
+    """
+    Yield every video with its channel URL as a dict, in id order, read from the cursor as consumed.
+    Claims are not exported: 'generating' videos are exported as 'pending' and 'posting' ones as 'error',
+    the same way release_stale_claims() resolves them.
+    """
+    columns = ["channel_url", "video_url", "title", "tweet_text", "tweet_media", "posted_status", "created_at",
+               "updated_at"]
+    select = ["c.channel_url", "v.video_url", "v.title", "v.tweet_text", "v.tweet_media", "v.posted_status",
+              "v.created_at", "v.updated_at"]
+    join = ""
+    if include_transcripts:
+        select += ["v.transcript", "a.transcript"]
+        join = " LEFT JOIN transcript_archive a ON a.video_id = v.id"
+    sql = f"SELECT {', '.join(select)} FROM videos v JOIN channels c ON c.id = v.channel_id{join} ORDER BY v.id"
+
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    try:
+        cursor = conn.execute(sql)
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            for row in rows:
+                video = dict(zip(columns, row))
+                video["posted_status"] = RELEASED_CLAIM_STATUSES.get(video["posted_status"], video["posted_status"])
+                if include_transcripts:
+                    transcript, archived = row[-2], row[-1]
+                    if transcript is None and archived is not None:
+                        transcript = zlib.decompress(archived).decode("utf-8")
+                    video["transcript"] = transcript
+                yield video
+    finally:
+        conn.close()
+
+
+def _import_status(video):
+    status = video.get("posted_status") or "pending"
+    status = RELEASED_CLAIM_STATUSES.get(status, status)
+    if status not in VIDEO_STATUSES:
+        raise ValueError(f"Video {video['video_url']}: unknown posted_status {status!r}")
+    return status
+
+
+@timed_query("import_catalog")
+def import_catalog(records, chunk_size=5000, signature=None):
+    """
+    Insert channel and video records (dicts with a 'type' of 'channel' or 'video', as produced by
+    iter_catalog_channels()/iter_catalog_videos()) in chunks inside a single transaction. Existing channels
+    (same URL or x_handle) and videos (same URL) are skipped. Videos reference their channel by channel_url.
+    'generating' and 'posting' statuses are imported as 'pending' and 'error'.
+
+    Args:
+        signature: Optional function returning (simhash, bands) of a transcript; when given, the
+            transcript_signatures of imported videos with a transcript are stored in the same transaction
+
+    Returns:
+        Dictionary with channels_added, videos_added and videos_skipped (duplicates or unknown channel)
+
+    Raises:
+        ValueError: A record has an unknown type or posted_status; nothing is imported
+    """
+    channel_ids = {}
+    channels = []
+    videos = []
+    stats = {"channels_added": 0, "videos_added": 0, "videos_skipped": 0}
+    last_id = 0  # highest video id before the current chunk; rows inserted after it get larger ids
+
+    def channel_id_for(conn, channel_url):
+        if channel_url not in channel_ids:
+            row = conn.execute("SELECT id FROM channels WHERE channel_url = ?", (channel_url,)).fetchone()
+            channel_ids[channel_url] = row[0] if row else None
+        return channel_ids[channel_url]
+
+    def flush_channels(conn):
+        before = conn.total_changes
+        conn.executemany("INSERT OR IGNORE INTO channels (x_handle, channel_url) VALUES (?, ?)", channels)
+        stats["channels_added"] += conn.total_changes - before
+        for _, channel_url in channels:
+            channel_ids.pop(channel_url, None)  # re-resolve: the channel may exist now
+        channels.clear()
+
+    def flush_videos(conn):
+        nonlocal last_id
+        if channels:
+            flush_channels(conn)
+        rows = []
+        for video in videos:
+            status = _import_status(video)
+            channel_id = channel_id_for(conn, video.get("channel_url"))
+            if channel_id is None:
+                continue
+            rows.append((
+                channel_id, video["video_url"], video.get("title"), video.get("transcript"), video.get("tweet_text"),
+                video.get("tweet_media"), status, video.get("created_at"), video.get("updated_at")
+            ))
+        before = conn.total_changes
+        conn.executemany(
+            "INSERT OR IGNORE INTO videos (channel_id, video_url, title, transcript, tweet_text, tweet_media, "
+            "posted_status, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP))",
+            rows
+        )
+        added = conn.total_changes - before
+        stats["videos_added"] += added
+        stats["videos_skipped"] += len(videos) - added
+        videos.clear()
+        if signature is not None and added:
+            save_signatures(conn)
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM videos").fetchone()[0]
+
+    def save_signatures(conn):
+        cursor = conn.execute(
+            "SELECT id, transcript FROM videos WHERE id > ? AND transcript IS NOT NULL", (last_id,)
+        )
+        rows = []
+        for video_id, transcript in cursor.fetchall():
+            simhash, bands = signature(transcript)
+            rows.append((video_id, _to_signed64(simhash), *bands))
+        conn.executemany(
+            "INSERT OR REPLACE INTO transcript_signatures (video_id, simhash, band0, band1, band2, band3) "
+            "VALUES (?, ?, ?, ?, ?, ?)", rows
+        )
+
+    with get_db() as conn:
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM videos").fetchone()[0]
+        for record in records:
+            kind = record.get("type")
+            if kind == "channel":
+                channels.append((record["x_handle"], record["channel_url"]))
+                if len(channels) >= chunk_size:
+                    flush_channels(conn)
+            elif kind == "video":
+                videos.append(record)
+                if len(videos) >= chunk_size:
+                    flush_videos(conn)
+            else:
+                raise ValueError(f"Unknown record type: {kind!r}")
+        if channels:
+            flush_channels(conn)
+        if videos:
+            flush_videos(conn)
+    return stats
@@ -0,0 +1,149 @@
+# dedup.py
+"""
+Near-duplicate transcript detection with 64-bit SimHash signatures.
+
+Each transcript gets a SimHash over its word 3-shingles. The signature is split into 4 bands of
+16 bits, each stored in an indexed column. Two signatures within Hamming distance 3 must agree
+exactly on at least one band (pigeonhole), so a lookup is 4 index probes plus a popcount over the
+few candidates, which stays sub-millisecond with 100k stored transcripts.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+from collections import Counter
+
+import database
+from metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+# Max differing bits (out of 64) for two transcripts to count as near-duplicates.
+# Up to 3 is exact with 4 bands; larger values only find candidates sharing a band.
+NEAR_DUPLICATE_MAX_DISTANCE = int(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", 3))
+# What to do with a near-duplicate: "skip" (mark 'duplicate'), "reuse" (reword the existing tweet) or "off"
+NEAR_DUPLICATE_ACTION = os.getenv("NEAR_DUPLICATE_ACTION", "skip").lower()
+NEAR_DUPLICATE_ACTIONS = ("skip", "reuse", "off")
+SIGNATURE_BACKFILL_BATCH = int(os.getenv("SIGNATURE_BACKFILL_BATCH", 500))
+
+SHINGLE_SIZE = 3
+BANDS = 4
+BAND_BITS = 64 // BANDS
+_BAND_MASK = (1 << BAND_BITS) - 1
+_WORD_RE = re.compile(r"\w+")
+
+if NEAR_DUPLICATE_MAX_DISTANCE >= BANDS:
+    logger.warning(
+        f"NEAR_DUPLICATE_MAX_DISTANCE={NEAR_DUPLICATE_MAX_DISTANCE} exceeds what {BANDS} bands guarantee; "
+        f"some near-duplicates may be missed"
+    )
+if NEAR_DUPLICATE_ACTION not in NEAR_DUPLICATE_ACTIONS:
+    logger.warning(
+        f"Unknown NEAR_DUPLICATE_ACTION={NEAR_DUPLICATE_ACTION!r} (expected one of {', '.join(NEAR_DUPLICATE_ACTIONS)}); "
+        f"using 'skip'"
+    )
+    NEAR_DUPLICATE_ACTION = "skip"
+
+
+def simhash(text):
+    """64-bit SimHash of a text over lowercase word shingles, weighted by shingle frequency."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) >= SHINGLE_SIZE:
+        features = Counter(" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1))
+    else:
+        features = Counter(words)
+
+    # Accumulate weight per (byte position, byte value) first; expanding to per-bit weights afterwards
+    # costs a constant 8 * 256 instead of 64 operations per feature.
+    byte_weights = [[0] * 256 for _ in range(8)]
+    total = 0
+    for feature, count in features.items():
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        for row, value in zip(byte_weights, digest):
+            row[value] += count
+        total += count
+
+    signature = 0
+    for position, row in enumerate(byte_weights):
+        for bit in range(8):
+            mask = 1 << bit
+            set_weight = sum(weight for value, weight in enumerate(row) if value & mask)
+            # Bit is set when features with it set outweigh those without it
+            if 2 * set_weight > total:
+                signature |= 1 << (position * 8 + bit)
+    return signature
+
+
+def bands(signature):
+    return [(signature >> (band * BAND_BITS)) & _BAND_MASK for band in range(BANDS)]
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def find_near_duplicate(video_id, transcript, max_distance=None):
+    """
+    Store the transcript's signature and return the closest earlier near-duplicate, or None.
+
+    Returns:
+        Dict with 'video_id', 'tweet_text', 'posted_status' and 'distance' of the match
+    """
+    max_distance = NEAR_DUPLICATE_MAX_DISTANCE if max_distance is None else max_distance
+    signature = simhash(transcript)
+    signature_bands = bands(signature)
+
+    best = None
+    for candidate_id, candidate_signature in database.find_signature_candidates(signature_bands, video_id):
+        distance = hamming_distance(signature, candidate_signature)
+        if distance <= max_distance and (best is None or distance < best[1]):
+            best = (candidate_id, distance)
+
+    database.save_transcript_signature(video_id, signature, signature_bands, best[0] if best else None)
+    record_cache_lookup("near_duplicate", best is not None)
+    if best is None:
+        return None
+
+    original = database.get_video_summary(best[0])
+    logger.info(f"Video {video_id} is a near-duplicate of video {best[0]} (distance {best[1]})")
+    return {
+        "video_id": best[0],
+        "tweet_text": original["tweet_text"] if original else None,
+        "posted_status": original["posted_status"] if original else None,
+        "distance": best[1],
+    }
+
+
+def signature_of(transcript):
+    """(simhash, bands) of a transcript, as database.import_catalog() and sign_unsigned_transcripts() take it."""
+    signature = simhash(transcript)
+    return signature, bands(signature)
+
+
+def backfill_signatures(batch_size=SIGNATURE_BACKFILL_BATCH):
+    """Sign every stored transcript that has no signature yet, one batch per transaction. Returns the count."""
+    signed = 0
+    while True:
+        count = database.sign_unsigned_transcripts(signature_of, batch_size)
+        signed += count
+        if count < batch_size:
+            return signed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate transcript maintenance.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    backfill_parser = subparsers.add_parser(
+        "backfill", help="Store signatures for transcripts saved before near-duplicate detection"
+    )
+    backfill_parser.add_argument("--batch-size", type=int, default=SIGNATURE_BACKFILL_BATCH)
+    args = parser.parse_args()
+
+    database.init_db()
+    print(json.dumps({"signed": backfill_signatures(args.batch_size)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# logging_setup.py
+"""
+Structured, non-blocking logging.
+
+Loggers only put records on an in-memory queue; a QueueListener thread formats them (JSON by default)
+and writes them to stderr. Messages and extra fields are capped at LOG_MAX_FIELD_CHARS before being
+enqueued, so a hot path never holds onto or serializes a large payload.
+
+Config:
+    LOG_LEVEL=INFO                             root level
+    LOG_LEVELS=youtube=DEBUG,x_handler=WARNING per-module levels
+    LOG_FORMAT=json                            json or text
+    LOG_MAX_FIELD_CHARS=1000                   cap for the message and each extra field
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", 1000))
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener = None
+
+
+def _truncate(value, limit):
+    if isinstance(value, str) and len(value) > limit:
+        return f"{value[:limit]}... [{len(value) - limit} chars truncated]"
+    return value
+
+
+class TruncatingQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues a small record: message rendered and capped, oversized extra fields capped."""
+
+    def __init__(self, log_queue, max_field_chars):
+        super().__init__(log_queue)
+        self.max_field_chars = max_field_chars
+
+    def prepare(self, record):
+        # Same process, so the record needn't be pickle-safe; exc_info is formatted by the listener
+        record = copy.copy(record)
+        record.msg = _truncate(record.getMessage(), self.max_field_chars)
+        record.args = None
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and isinstance(value, str):
+                setattr(record, key, _truncate(value, self.max_field_chars))
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def _parse_levels(spec):
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.strip().partition("=")
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    """Route all logging through a background QueueListener. Safe to call more than once."""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stderr)
+    if LOG_FORMAT == "text":
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    else:
+        output.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(TruncatingQueueHandler(log_queue, LOG_MAX_FIELD_CHARS))
+    root.setLevel(LOG_LEVEL)
+    for name, level in _parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,33 +1,58 @@
 # main.py
 import os
 import asyncio
+import json
 import httpx
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, UploadFile, File
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import uvicorn
-from dotenv import load_dotenv
 import logging
 
+import clients
+
+# Load .env once, before any module reads its config at import time
+clients.load_env()
+
 from database import init_db, get_all_channels, add_video, get_videos_by_status, update_video_transcript, \
-    update_video_status, get_video_info_by_url, add_channels_from_list, add_channel, get_video_urls_by_channel_id
+    update_video_status, get_video_info_by_url, add_channels_from_list, add_channel, get_video_urls_by_channel_id, \
+    count_videos_by_status, archive_published_transcripts, incremental_vacuum, claim_video, release_video_claim, \
+    release_stale_claims, update_video_tweet_text, iter_videos, list_videos, resolve_video_columns, get_transcript
+import catalog
+import coordination
+import dedup
+import logging_setup
+import media
+import metrics
+import onboarding
+import resilience
+import tracing
+import tweet_length
 from youtube import extract_transcript
-from openai_handler import generate_tweet
+from openai_handler import generate_tweet, rewrite_tweet
 from x_handler import post_tweet
-from youtube_channel_video_extractor import YouTubePlaylistExtractor
-
-load_dotenv()
 
 # Config
 SYSTEM_AUTH_TOKEN = os.getenv("SYSTEM_AUTH_TOKEN")
-YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 PORT = int(os.getenv("PORT", 8006))
+TRANSCRIPT_ARCHIVE_BATCH = int(os.getenv("TRANSCRIPT_ARCHIVE_BATCH", 500))
+TRANSCRIPT_ARCHIVE_MAX_BATCHES = int(os.getenv("TRANSCRIPT_ARCHIVE_MAX_BATCHES", 20))
+TRANSCRIPT_VACUUM_PAGES = int(os.getenv("TRANSCRIPT_VACUUM_PAGES", 2000))
+VIDEO_LIST_MAX_LIMIT = int(os.getenv("VIDEO_LIST_MAX_LIMIT", 1000))
+VIDEO_CLAIM_TIMEOUT = int(os.getenv("VIDEO_CLAIM_TIMEOUT", 900))  # seconds before a dead node's claim is released
 
 # Setup
-logging.basicConfig(level=logging.INFO)
+logging_setup.setup_logging()
 logger = logging.getLogger(__name__)
 security = HTTPBearer()
 
-youtube_extractor = YouTubePlaylistExtractor(YOUTUBE_API_KEY)
+# Queue depth is computed from the DB only when /metrics is scraped
+metrics.register_gauge(
+    "videos_by_status",
+    "Number of videos in each posted_status.",
+    ("status",),
+    lambda: {(status or "",): count for status, count in count_videos_by_status().items()}
+)
 
 
 # Auth
@@ -44,6 +69,14 @@ app = FastAPI(title="YouTube-to-X Auto-Posting")
 @app.on_event("startup")
 async def startup():
     init_db()
+    coordination.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    coordination.stop()
+    tracing.flush()
+    logging_setup.shutdown_logging()
 
 
 """
@@ -66,12 +99,14 @@ async def add_channel_videos(credentials=Depends(authenticate)):
             channel_id = add_channel(channel_data["x_handle"], channel_data["channel_url"])
 
             # Get all video URLs from channel using YouTubePlaylistExtractor
-            video_urls = youtube_extractor.get_all_video_URLs(channel_data["channel_url"])
+            video_urls = clients.get("youtube").get_all_video_URLs(channel_data["channel_url"])
 
             # Save each video URL to DB
             for video_url in video_urls:
                 if not get_video_info_by_url(video_url):
-                    add_video(channel_id, video_url)
+                    with tracing.span("add_video", trace_id=tracing.trace_id_for_video(video_url),
+                                      video_url=video_url, channel_id=channel_id):
+                        add_video(channel_id, video_url)
                     total_videos += 1
 
         except Exception as e:
@@ -81,13 +116,42 @@ async def add_channel_videos(credentials=Depends(authenticate)):
     return {"status": "success", "channels_processed": len(channel_list), "videos_added": total_videos}
 
 
+@app.post("/channels/import", status_code=202)
+async def import_channels(background_tasks: BackgroundTasks, file: UploadFile = File(...),
+                          credentials=Depends(authenticate)):
+    """
+    Bulk-onboard channels from a CSV (x_handle,channel_url header) or JSON upload. Handles are resolved
+    concurrently, channels are inserted in one transaction and their videos are backfilled in the background.
+    Poll GET /channels/import/{job_id} for per-channel progress.
+    """
+    try:
+        channels = onboarding.parse_channel_list(await file.read(), file.filename)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid channel list: {e}")
+    if not channels:
+        raise HTTPException(status_code=400, detail="No channels in upload")
+
+    job_id = onboarding.create_job(channels)
+    background_tasks.add_task(onboarding.run_job, job_id, clients.get("youtube"))
+    return {"status": "accepted", "job_id": job_id, "channels": len(channels)}
+
+
+@app.get("/channels/import/{job_id}")
+async def get_channel_import(job_id: str, credentials=Depends(authenticate)):
+    job = onboarding.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+
 @app.post("/scan-new-channel-videos")
 async def scan_new_videos(credentials=Depends(authenticate)):
     """
-    Scan all channels in the database, fetch live video URLs from YouTube, compare with existing URLs in the DB,
+    Scan all channels in the database (with coordination, those in this node's shards), fetch live video URLs from YouTube, compare with existing URLs in the DB,
     add any new videos to the videos table, and log the process. Returns the number of new videos added.
     """
-    channels = get_all_channels()
+    # With several nodes, each scans only the channels in its leased shards
+    channels = [channel for channel in get_all_channels() if coordination.owns_channel(channel[2])]
     new_videos = 0
 
     for channel in channels:
@@ -96,8 +160,12 @@ async def scan_new_videos(credentials=Depends(authenticate)):
 
         # print(f"\n--- Processing channel: {channel}")
         # print(f"channel_id={channel_id}")
-        # Get live video URLs from YouTube
-        channel_video_urls = youtube_extractor.get_all_video_URLs(channel_url)
+        # Get live video URLs from YouTube; stop early while YouTube is unavailable
+        try:
+            channel_video_urls = clients.get("youtube").get_all_video_URLs(channel_url)
+        except resilience.ServiceUnavailable as e:
+            logger.error(f"Stopping scan, YouTube unavailable: {e}")
+            break
         # print(f"Live video URLs from YouTube for channel_id={channel_id}: {channel_video_urls}")
         # Get existing video URLs from DB
         db_video_urls = set(get_video_urls_by_channel_id(channel_id))
@@ -107,53 +175,249 @@ async def scan_new_videos(credentials=Depends(authenticate)):
         # print(f"New video URLs to add for channel_id={channel_id}: {new_urls}")
         for video_url in new_urls:
             # print(f"  Adding new video: channel_id={channel_id}, video_url={video_url}")
-            add_video(channel_id, video_url)
+            with tracing.span("add_video", trace_id=tracing.trace_id_for_video(video_url),
+                              video_url=video_url, channel_id=channel_id):
+                add_video(channel_id, video_url)
             new_videos += 1
 
     # print(f"Total new videos added: {new_videos}")
     return {"status": "success", "new_videos": new_videos}
 
 
+def _generate_for_video(video):
+    """
+    Extract the transcript if missing, check for a near-duplicate and generate the tweet of a claimed video.
+    Returns (response, status the claim is released with).
+    """
+    video_id = video['id']
+    video_url = video['video_url']
+    transcript = video['transcript']
+    processed = 0
+    with tracing.trace_video(video_url):
+        if not transcript:
+            # A re-queued video may have its transcript in cold storage already
+            transcript = get_transcript(video_id)
+        if not transcript:
+            with tracing.span("extract_transcript", video_url=video_url) as span:
+                transcript = extract_transcript(video_url)
+                if span and not transcript:
+                    span.mark_error("no transcript")
+        duplicate = None
+        if transcript and dedup.NEAR_DUPLICATE_ACTION != "off":
+            with tracing.span("near_duplicate_lookup", video_url=video_url) as span:
+                duplicate = dedup.find_near_duplicate(video_id, transcript)
+                if span and duplicate:
+                    span.set_attribute("duplicate_of", duplicate['video_id'])
+        if duplicate and (dedup.NEAR_DUPLICATE_ACTION == "skip" or not duplicate['tweet_text']):
+            # Skip the LLM call; the video leaves the pending queue
+            update_video_transcript(video_id, transcript, None)
+            return {"status": "success", "processed": 0, "video_id": video_id,
+                    "duplicate_of": duplicate['video_id']}, 'duplicate'
+        if duplicate:
+            # X rejects a tweet identical to one already posted, so the original's tweet is reworded
+            with tracing.span("rewrite_tweet", video_url=video_url) as span:
+                tweet_text = rewrite_tweet(duplicate['tweet_text'])
+                if span and not tweet_text:
+                    span.mark_error("no tweet rewritten")
+            update_video_transcript(video_id, transcript, tweet_text)
+            return {"status": "success", "processed": 1 if tweet_text else 0, "video_id": video_id,
+                    "duplicate_of": duplicate['video_id']}, 'pending'
+        if transcript:
+            with tracing.span("generate_tweet", video_url=video_url) as span:
+                tweet_text = generate_tweet(transcript)
+                if span and not tweet_text:
+                    span.mark_error("no tweet generated")
+            # Keep the transcript even if generation failed, so the next run retries only generation
+            update_video_transcript(video_id, transcript, tweet_text)
+            processed = 1 if tweet_text else 0
+    return {"status": "success", "processed": processed, "video_id": video_id}, 'pending'
+
+
 @app.post("/generate-tweets")
 async def generate_tweets(credentials=Depends(authenticate)):
     """
     Generate a tweet for the (first) pending video only. If first row has status pending, it won't generate another
-    tweet, until this is one gets published
+    tweet, until this is one gets published. The thumbnail is fetched while the tweet is generated and uploaded to X
+    once the tweet exists, so posting only has to attach the media ID.
     """
-    videos = get_videos_by_status('pending')
+    release_stale_claims(VIDEO_CLAIM_TIMEOUT)
+    # The first pending video (lowest id); the only transcript read
+    videos = list_videos(status='pending', limit=1,
+                         columns=('video_url', 'transcript', 'tweet_text', 'tweet_media'))
     if not videos:
         return {"status": "success", "processed": 0, "message": "No pending videos found."}
-
-    # Find the first pending video (lowest id)
-    first_video = min(videos, key=lambda v: v['id'])
-    processed = 0
-    if not first_video['transcript']:
-        transcript = extract_transcript(first_video['video_url'])
-        if transcript:
-            tweet_text = generate_tweet(transcript)
-            update_video_transcript(first_video['id'], transcript, tweet_text)
-            processed = 1
-
-    return {"status": "success", "processed": processed, "video_id": first_video['id']}
+    first_video = videos[0]
+    if first_video['tweet_text']:
+        return {"status": "success", "processed": 0, "video_id": first_video['id']}
+
+    # Claim the video so no other node generates it at the same time; released as pending or duplicate
+    if not claim_video(first_video['id'], coordination.NODE_ID, 'generating'):
+        return {"status": "success", "processed": 0, "message": "Video claimed by another node."}
+    final_status = 'pending'
+    will_post = False
+    # The thumbnail download overlaps generation; only the upload waits to see whether the video will be posted
+    thumbnail = asyncio.create_task(
+        asyncio.to_thread(media.prefetch_thumbnail, first_video['video_url'], first_video['tweet_media'])
+    )
+    try:
+        result, final_status = await asyncio.to_thread(_generate_for_video, first_video)
+        await thumbnail
+        will_post = final_status == 'pending' and bool(result['processed'])
+        if will_post:
+            await asyncio.to_thread(media.prepare_media, first_video['id'], first_video['video_url'],
+                                    first_video['tweet_media'])
+    finally:
+        if not thumbnail.done():
+            await thumbnail
+        if not will_post:
+            # Duplicate, failed generation or error: the cached thumbnail is refetched if the video is retried
+            media.discard_thumbnail(first_video['video_url'])
+        release_video_claim(first_video['id'], coordination.NODE_ID, final_status)
+    return result
 
 
 @app.post("/post-to-x")
 async def post_to_x(credentials=Depends(authenticate)):
-    videos = get_videos_by_status('pending')
+    """
+    Post every pending video with tweet text from channels owned by this node. Each video is claimed
+    atomically first, so with several nodes running no video is posted twice.
+    """
+    release_stale_claims(VIDEO_CLAIM_TIMEOUT)
+    owned_channel_ids = {channel[0] for channel in get_all_channels() if coordination.owns_channel(channel[2])}
+    videos = get_videos_by_status('pending', columns=('channel_id', 'video_url', 'tweet_text', 'tweet_media'))
     posted = 0
 
     for video in videos:
-        if video['tweet_text']:
-            success = post_tweet(video['tweet_text'])
-            if success:
-                update_video_status(video['id'], 'published')
-                posted += 1
-            else:
-                update_video_status(video['id'], 'error')
+        if not video['tweet_text'] or video['channel_id'] not in owned_channel_ids:
+            continue
+        if not claim_video(video['id'], coordination.NODE_ID, 'posting'):
+            continue
+        # Check the length the way X counts it, so an over-length tweet never costs a failed API call
+        tweet_text = tweet_length.repair(video['tweet_text'])
+        if not tweet_text:
+            release_video_claim(video['id'], coordination.NODE_ID, 'error')
+            media.discard_thumbnail(video['video_url'])
+            continue
+        if tweet_text != video['tweet_text']:
+            # Also saved when only normalization or surrounding whitespace changed
+            if tweet_length.weighted_length(video['tweet_text']) > tweet_length.MAX_WEIGHTED_LENGTH:
+                logger.warning(f"Shortened tweet of video {video['id']} to fit X's weighted length limit")
+            update_video_tweet_text(video['id'], tweet_text)
+        # Usually uploaded during generation; redone here if missing or expired
+        media_id = await asyncio.to_thread(media.prepare_media, video['id'], video['video_url'],
+                                           video['tweet_media'])
+        try:
+            with tracing.span("post_tweet", trace_id=tracing.trace_id_for_video(video['video_url']),
+                              video_url=video['video_url']) as span:
+                success = post_tweet(tweet_text, media_id=media_id)
+                if span and not success:
+                    span.mark_error("post failed")
+        except resilience.ServiceUnavailable as e:
+            # Transient: leave this and the remaining videos pending for the next run
+            logger.error(f"Stopping posting, X unavailable: {e}")
+            release_video_claim(video['id'], coordination.NODE_ID, 'pending')
+            break
+        release_video_claim(video['id'], coordination.NODE_ID, 'published' if success else 'error')
+        # Either way the video is done with; a cached thumbnail would never be read again
+        media.discard_thumbnail(video['video_url'])
+        if success:
+            posted += 1
 
     return {"status": "success", "posted": posted}
 
 
+def _stream_videos(after_id, limit, status, channel_id, columns):
+    """JSON page of videos written as rows are read, followed by the cursor for the next page."""
+    yield '{"videos": ['
+    videos = iter_videos(after_id, limit + 1, status, channel_id, columns)
+    count = 0
+    last_id = None
+    has_more = False
+    chunk = []
+    try:
+        for video in videos:
+            if count == limit:
+                has_more = True
+                break
+            chunk.append(json.dumps(video, default=str))
+            last_id = video['id']
+            count += 1
+            if len(chunk) == 100:
+                yield ("," if count > len(chunk) else "") + ",".join(chunk)
+                chunk = []
+    finally:
+        videos.close()
+    if chunk:
+        yield ("," if count > len(chunk) else "") + ",".join(chunk)
+    yield f'], "count": {count}, "next_after_id": {json.dumps(last_id if has_more else None)}}}'
+
+
+@app.get("/videos")
+async def get_videos(status: str = None, channel_id: int = None, after_id: int = 0, limit: int = 100,
+                      fields: str = None, credentials=Depends(authenticate)):
+    """
+    Page through videos in id order, optionally filtered by status and channel. Pass the returned
+    `next_after_id` as `after_id` for the next page (null on the last page). `fields` is a comma-separated
+    column list; the transcript is only included when requested.
+    """
+    limit = max(1, min(limit, VIDEO_LIST_MAX_LIMIT))
+    try:
+        columns = resolve_video_columns([f.strip() for f in fields.split(",") if f.strip()] if fields else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(_stream_videos(after_id, limit, status, channel_id, columns),
+                             media_type="application/json")
+
+
+@app.get("/catalog/export")
+async def export_catalog(transcripts: bool = False, gzip: bool = False, credentials=Depends(authenticate)):
+    """
+    Stream all channels and videos as NDJSON (gzip-compressed with `gzip=true`), for seeding another
+    instance through /catalog/import without re-crawling YouTube. Transcripts are included with `transcripts=true`.
+    """
+    filename = "catalog.ndjson.gz" if gzip else "catalog.ndjson"
+    return StreamingResponse(
+        catalog.iter_export(transcripts, gzip),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@app.post("/catalog/import")
+async def import_catalog_file(file: UploadFile = File(...), credentials=Depends(authenticate)):
+    """
+    Load an NDJSON catalog (plain or gzipped) from /catalog/export in a single transaction. Channels are
+    matched by URL and existing channels and videos are skipped, so importing the same file twice is harmless.
+    """
+    try:
+        stats = await asyncio.to_thread(catalog.import_file, file.file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid catalog, nothing imported: {e}")
+    return {"status": "success", **stats}
+
+
+def _archive_transcripts():
+    archived = 0
+    for _ in range(TRANSCRIPT_ARCHIVE_MAX_BATCHES):
+        count = archive_published_transcripts(TRANSCRIPT_ARCHIVE_BATCH)
+        archived += count
+        if count < TRANSCRIPT_ARCHIVE_BATCH:
+            break
+    return archived
+
+
+@app.post("/archive-transcripts")
+async def archive_transcripts(credentials=Depends(authenticate)):
+    """
+    Move transcripts of published videos into compressed cold storage in small batches, then return
+    a bounded number of free pages to the filesystem with an incremental VACUUM.
+    """
+    # Both steps block on SQLite (a first VACUUM rewrites the whole file), so they run off the event loop
+    archived = await asyncio.to_thread(_archive_transcripts)
+    pages_freed = await asyncio.to_thread(incremental_vacuum, TRANSCRIPT_VACUUM_PAGES)
+    return {"status": "success", "archived": archived, "pages_freed": pages_freed}
+
+
 async def newYoutubeVideoToXpost():
     """
     Performs the complete workflow: fetch videos, scan new videos, generate tweets, and post to X.
@@ -166,7 +430,8 @@ async def newYoutubeVideoToXpost():
         steps = [
             ("scan-new-channel-videos", f"{base_url}/scan-new-channel-videos"),
             ("generate-tweets", f"{base_url}/generate-tweets"),
-            ("post-to-x", f"{base_url}/post-to-x")
+            ("post-to-x", f"{base_url}/post-to-x"),
+            ("archive-transcripts", f"{base_url}/archive-transcripts")
         ]
         
         results = {}
@@ -208,6 +473,43 @@ async def get_status(credentials=Depends(authenticate)):
     return {"status": "healthy", "message": "Service running"}
 
 
+@app.get("/coordination")
+async def get_coordination(credentials=Depends(authenticate)):
+    """This node's shard leases and the live nodes sharing the channel list."""
+    if not coordination.COORDINATION_ENABLED:
+        return {"enabled": False, "node_id": coordination.NODE_ID}
+    return {"enabled": True, **coordination.coordinator.get_state()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(credentials=Depends(authenticate)):
+    """Prometheus text-format metrics: external call latency, OpenAI tokens, queue depth, DB timings, caches."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/traces")
+async def get_traces(limit: int = 20, stage: str = None, credentials=Depends(authenticate)):
+    """
+    Worst-case videos by end-to-end time (discovery to posting), or the slowest spans of one stage
+    when `stage` is given (e.g. `extract_transcript`, `openai.chat_completion`).
+    """
+    return {"traces": tracing.get_slowest_traces(limit=min(limit, 500), stage=stage)}
+
+
+@app.get("/traces/stages")
+async def get_trace_stages(credentials=Depends(authenticate)):
+    """Per-stage span counts and durations, slowest stage first."""
+    return {"stages": tracing.get_stage_summary()}
+
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str, credentials=Depends(authenticate)):
+    spans = tracing.get_trace(trace_id)
+    if not spans:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return {"trace_id": trace_id, "spans": spans}
+
+
 @app.get("/")
 async def get_home():
     return {"app": "Youtube to X posting", "status": "OK", "message": "Youtube to X service is running"}
@@ -0,0 +1,90 @@
+# media.py
+"""
+Thumbnail media stage: fetch a video's thumbnail (cached on disk by video ID), upload it to X ahead of
+posting and keep the returned media ID with its expiry in videos.tweet_media, e.g.
+{"media_id": "1790000000000000000", "expires_at": 1760000000}. Posting then only attaches the ID;
+an expired upload is redone from the cached file.
+"""
+import json
+import logging
+import os
+import time
+
+import resilience
+import tracing
+from database import update_video_media
+from x_handler import upload_media
+from youtube import fetch_thumbnail, get_video_id, THUMBNAIL_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_MEDIA_ENABLED = os.getenv("THUMBNAIL_MEDIA_ENABLED", "true").lower() == "true"
+# An upload this close to expiry is redone rather than attached
+MEDIA_EXPIRY_MARGIN = int(os.getenv("MEDIA_EXPIRY_MARGIN", 600))
+
+
+def get_media_id(tweet_media):
+    """Media ID stored in a tweet_media value if it is still usable, else None."""
+    if not tweet_media:
+        return None
+    try:
+        media = json.loads(tweet_media)
+        if media["expires_at"] - MEDIA_EXPIRY_MARGIN > time.time():
+            return media["media_id"]
+    except (ValueError, TypeError, KeyError):
+        logger.warning(f"Ignoring malformed tweet_media: {tweet_media[:100]}")
+    return None
+
+
+def prefetch_thumbnail(video_url, tweet_media=None):
+    """
+    Download the video's thumbnail into the cache ahead of prepare_media(), e.g. while its tweet is being
+    generated. Skipped if media is disabled or an unexpired upload exists; never raises.
+    """
+    if not THUMBNAIL_MEDIA_ENABLED or get_media_id(tweet_media):
+        return None
+    try:
+        return fetch_thumbnail(video_url)
+    except Exception as e:
+        logger.error(f"Error prefetching thumbnail for {video_url}: {e}")
+        return None
+
+
+def prepare_media(video_id, video_url, tweet_media=None):
+    """
+    Make sure the video has an unexpired thumbnail upload and return its media ID, or None if media is
+    disabled or unavailable. Failures never block the tweet itself, which is then posted without media.
+    """
+    if not THUMBNAIL_MEDIA_ENABLED:
+        return None
+    media_id = get_media_id(tweet_media)
+    if media_id:
+        return media_id
+
+    with tracing.span("prepare_media", trace_id=tracing.trace_id_for_video(video_url), video_url=video_url) as span:
+        try:
+            path = fetch_thumbnail(video_url)
+            uploaded = upload_media(path) if path else None
+        except resilience.ServiceUnavailable as e:
+            logger.warning(f"Skipping media for video {video_id}, X unavailable: {e}")
+            uploaded = None
+        except Exception as e:
+            logger.error(f"Error preparing media for video {video_id}: {e}")
+            uploaded = None
+        if not uploaded:
+            if span:
+                span.mark_error("no media")
+            return None
+        update_video_media(video_id, json.dumps(uploaded))
+        return uploaded["media_id"]
+
+
+def discard_thumbnail(video_url):
+    """Remove a cached thumbnail once its video is done with: published, failed or skipped as a duplicate."""
+    video_id = get_video_id(video_url)
+    if not video_id:
+        return
+    try:
+        os.remove(os.path.join(THUMBNAIL_CACHE_DIR, f"{video_id}.jpg"))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,266 @@
+# metrics.py
+"""
+Minimal in-process metrics registry rendered in Prometheus text format.
+
+Recording a sample is a dict lookup, a bisect and an increment under a lock, so it is cheap
+enough for the hot paths. Gauges that need a DB query are computed only when /metrics is scraped.
+"""
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers fast DB queries through slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    metric_type = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = self.header()
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (+Inf last), sum, count]
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._values.items())
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class CallbackGauge(_Metric):
+    """Gauge whose samples are produced on scrape by a callback returning {label tuple: value}."""
+    metric_type = "gauge"
+
+    def __init__(self, name, documentation, labels, callback):
+        super().__init__(name, documentation, labels)
+        self.callback = callback
+
+    def render(self):
+        lines = self.header()
+        for key, value in sorted(self.callback().items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+EXTERNAL_CALL_SECONDS = REGISTRY.register(Histogram(
+    "external_call_duration_seconds",
+    "Latency of calls to external services.",
+    labels=("service", "operation", "outcome")
+))
+OPENAI_TOKENS = REGISTRY.register(Counter(
+    "openai_tokens_total",
+    "OpenAI tokens consumed, by model and token type.",
+    labels=("model", "type")
+))
+DB_QUERY_SECONDS = REGISTRY.register(Histogram(
+    "db_query_duration_seconds",
+    "Latency of database operations.",
+    labels=("query",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "cache_requests_total",
+    "Cache lookups by cache and result (hit or miss).",
+    labels=("cache", "result")
+))
+
+
+def _cache_hit_ratios():
+    values = CACHE_REQUESTS.snapshot()
+    ratios = {}
+    for cache in {key[0] for key in values}:
+        hits = values.get((cache, "hit"), 0)
+        total = hits + values.get((cache, "miss"), 0)
+        ratios[(cache,)] = hits / total if total else 0
+    return ratios
+
+
+CACHE_HIT_RATIO = REGISTRY.register(CallbackGauge(
+    "cache_hit_ratio",
+    "Fraction of cache lookups that were hits since process start.",
+    labels=("cache",),
+    callback=_cache_hit_ratios
+))
+
+
+@contextmanager
+def track_external_call(service, operation):
+    """
+    Time an external call. The outcome label is 'error' if the block raises or calls mark_error().
+    """
+    call = _ExternalCall()
+    start = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        call.outcome = "error"
+        raise
+    finally:
+        EXTERNAL_CALL_SECONDS.observe(
+            time.perf_counter() - start, service=service, operation=operation, outcome=call.outcome
+        )
+
+
+class _ExternalCall:
+    __slots__ = ("outcome",)
+
+    def __init__(self):
+        self.outcome = "success"
+
+    def mark_error(self):
+        self.outcome = "error"
+
+
+def timed_query(query_name):
+    """Decorator recording the duration of a database function."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                DB_QUERY_SECONDS.observe(time.perf_counter() - start, query=query_name)
+        return wrapper
+    return decorator
+
+
+def record_cache_lookup(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_openai_usage(model, usage):
+    """Record token usage from an OpenAI response's `usage` object (may be None)."""
+    if usage is None:
+        return
+    for token_type in ("prompt_tokens", "completion_tokens"):
+        count = getattr(usage, token_type, None)
+        if count:
+            OPENAI_TOKENS.inc(count, model=model, type=token_type.replace("_tokens", ""))
+
+
+def register_gauge(name, documentation, labels, callback):
+    return REGISTRY.register(CallbackGauge(name, documentation, labels, callback))
+
+
+def render():
+    return REGISTRY.render()
@@ -0,0 +1,178 @@
+# onboarding.py
+"""
+Bulk channel onboarding: parse an uploaded CSV/JSON list of (x_handle, channel_url) pairs, resolve
+channel IDs concurrently, insert all channels in one transaction and backfill their videos in the
+background while tracking per-channel progress.
+"""
+import csv
+import io
+import json
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import resilience
+from database import add_channels_from_list, add_videos
+
+logger = logging.getLogger(__name__)
+
+ONBOARDING_WORKERS = int(os.getenv("ONBOARDING_WORKERS", 8))
+ONBOARDING_MAX_CHANNELS = int(os.getenv("ONBOARDING_MAX_CHANNELS", 1000))
+ONBOARDING_MAX_JOBS = 50  # finished jobs kept in memory for progress queries
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def parse_channel_list(content, filename=None):
+    """
+    Parse channel pairs from CSV (with an x_handle,channel_url header) or JSON (a list of objects,
+    or an object with a 'channels' list).
+
+    Raises:
+        ValueError: The content is malformed, or a row is missing a field or has a non-string one
+    """
+    text = content.decode("utf-8-sig") if isinstance(content, bytes) else content
+    stripped = text.lstrip()
+    is_json = (filename or "").lower().endswith(".json") or stripped.startswith(("[", "{"))
+
+    if is_json:
+        data = json.loads(text)
+        rows = data.get("channels", []) if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise ValueError("Expected a list of channels, or an object with a 'channels' list")
+    else:
+        rows = list(csv.DictReader(io.StringIO(text)))
+
+    channels = []
+    seen = set()
+    for number, row in enumerate(rows, 1):
+        if not isinstance(row, dict):
+            raise ValueError(f"Row {number}: expected an object with x_handle and channel_url")
+        x_handle = row.get("x_handle") or ""
+        channel_url = row.get("channel_url") or ""
+        if not isinstance(x_handle, str) or not isinstance(channel_url, str):
+            raise ValueError(f"Row {number}: x_handle and channel_url must be strings")
+        x_handle, channel_url = x_handle.strip(), channel_url.strip()
+        if not x_handle or not channel_url:
+            raise ValueError(f"Row {number}: x_handle and channel_url are required")
+        if channel_url in seen:
+            continue
+        seen.add(channel_url)
+        channels.append({"x_handle": x_handle, "channel_url": channel_url})
+
+    if len(channels) > ONBOARDING_MAX_CHANNELS:
+        raise ValueError(f"At most {ONBOARDING_MAX_CHANNELS} channels per import, got {len(channels)}")
+    return channels
+
+
+def create_job(channels):
+    job_id = uuid.uuid4().hex
+    job = {
+        "job_id": job_id,
+        "status": "queued",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "finished_at": None,
+        "channels": [
+            {**channel, "status": "queued", "youtube_channel_id": None, "channel_id": None, "videos_added": 0,
+             "error": None}
+            for channel in channels
+        ],
+    }
+    with _jobs_lock:
+        _jobs[job_id] = job
+        finished = [j for j in _jobs.values() if j["finished_at"]]
+        for old in sorted(finished, key=lambda j: j["finished_at"])[:max(0, len(_jobs) - ONBOARDING_MAX_JOBS)]:
+            del _jobs[old["job_id"]]
+    return job_id
+
+
+def get_job(job_id):
+    """Return a snapshot of a job with per-channel progress and status counts, or None."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        snapshot = {**job, "channels": [dict(c) for c in job["channels"]]}
+    counts = {}
+    for channel in snapshot["channels"]:
+        counts[channel["status"]] = counts.get(channel["status"], 0) + 1
+    snapshot["summary"] = counts
+    return snapshot
+
+
+def _update(entry, **fields):
+    with _jobs_lock:
+        entry.update(fields)
+
+
+def run_job(job_id, extractor):
+    """Resolve, insert and backfill every channel of a job. Intended to run as background work."""
+    with _jobs_lock:
+        job = _jobs[job_id]
+        job["status"] = "running"
+        entries = list(job["channels"])
+
+    try:
+        # Resolve channel IDs concurrently; each handle needs its own channels.list call
+        def resolve(entry):
+            _update(entry, status="resolving")
+            try:
+                channel_id = extractor.get_channel_id_from_url(entry["channel_url"])
+            except resilience.ServiceUnavailable as e:
+                _update(entry, status="error", error=str(e))
+                return
+            if channel_id:
+                _update(entry, status="resolved", youtube_channel_id=channel_id)
+            else:
+                _update(entry, status="error", error="Could not resolve channel")
+
+        with ThreadPoolExecutor(max_workers=ONBOARDING_WORKERS) as pool:
+            list(pool.map(resolve, entries))
+
+        resolved = [e for e in entries if e["status"] == "resolved"]
+
+        # Uploads playlists for all resolved channels, 50 per channels.list call
+        try:
+            uploads = extractor.get_uploads_playlist_ids([e["youtube_channel_id"] for e in resolved])
+        except resilience.ServiceUnavailable as e:
+            # Nothing is inserted, so the channels can be imported again once YouTube is back
+            for entry in resolved:
+                _update(entry, status="error", error=str(e))
+            resolved, uploads = [], {}
+
+        # One transaction for all channel rows
+        channel_ids = add_channels_from_list(resolved)
+        for entry in resolved:
+            channel_id = channel_ids.get(entry["channel_url"])
+            if channel_id is None:
+                _update(entry, status="error", error="x_handle already used by another channel")
+            elif entry["youtube_channel_id"] not in uploads:
+                _update(entry, channel_id=channel_id, status="error", error="Uploads playlist not found")
+            else:
+                _update(entry, channel_id=channel_id, status="queued_backfill")
+
+        def backfill(entry):
+            _update(entry, status="backfilling")
+            try:
+                video_urls = extractor.get_playlist_videos(uploads[entry["youtube_channel_id"]])
+                added = add_videos(entry["channel_id"], video_urls)
+                _update(entry, status="done", videos_added=added)
+            except Exception as e:
+                logger.error(f"Backfill failed for {entry['channel_url']}: {e}")
+                _update(entry, status="error", error=str(e))
+
+        with ThreadPoolExecutor(max_workers=ONBOARDING_WORKERS) as pool:
+            list(pool.map(backfill, [e for e in entries if e["status"] == "queued_backfill"]))
+
+        final_status = "completed"
+    except Exception as e:
+        logger.error(f"Channel import {job_id} failed: {e}")
+        final_status = "failed"
+
+    with _jobs_lock:
+        job["status"] = final_status
+        job["finished_at"] = datetime.now(timezone.utc).isoformat()
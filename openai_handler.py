@@ -4,18 +4,24 @@ import os
 import logging
 import re
 
-from dotenv import load_dotenv
-from openai import OpenAI
+import clients
+import resilience
+import tracing
+import tweet_length
+from metrics import track_external_call, record_openai_usage
 
 logger = logging.getLogger(__name__)
 
-load_dotenv()
+clients.load_env()
 
 # Load config from environment variables
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # None uses the official endpoint
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
 OPENAI_TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE", 0.7))
 OPENAI_MAX_TOKENS = int(os.getenv("OPENAI_MAX_TOKENS", 280))  # 280 chars for tweet
+# Ask the model once to shorten an over-length tweet that can't be cut at a sentence boundary
+TWEET_SHORTEN_RETRY = os.getenv("TWEET_SHORTEN_RETRY", "true").lower() == "true"
 
 # Prompt template for tweet generation
 TWEET_PROMPT_TEMPLATE = (
@@ -25,20 +31,59 @@ TWEET_PROMPT_TEMPLATE = (
     "forbidden to use emoji and hashtag.\n\n "
     "Transcript:\n{transcript}\n\nTweet:"
 )
+# Shortening an over-length tweet (see fit_tweet)
+SHORTEN_PROMPT_TEMPLATE = (
+    "This tweet is {length} characters as X counts them (links count as 23, CJK characters and emoji as 2). "
+    "Rewrite it to at most {max_length} characters, keeping the main idea and any links. "
+    "Reply with the tweet only.\n\nTweet:\n{tweet}"
+)
+# Rewording a near-duplicate's tweet, which X would reject if posted again verbatim
+REWRITE_PROMPT_TEMPLATE = (
+    "Rewrite this tweet with different wording, keeping the main idea, any links and the same style rules: "
+    "no emoji and no hashtags, at most 270 characters. Reply with the tweet only.\n\nTweet:\n{tweet}"
+)
 
-# Create OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
 
+def _build_client():
+    # Imported here so processes that never generate tweets don't pay for the SDK import
+    from openai import OpenAI
+    # Retries are handled by the shared resilience layer
+    return OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, max_retries=0)
 
-def get_chat_completion(messages, model, temperature, max_tokens):
-    try:
-        response = client.chat.completions.create(
+
+clients.register("openai", _build_client)
+
+
+def _is_retryable_error(e):
+    import openai
+    return isinstance(e, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError))
+
+
+def _create_chat_completion(messages, model, temperature, max_tokens):
+    with track_external_call("openai", "chat_completion"), tracing.span("openai.chat_completion", model=model) as span:
+        response = clients.get("openai").chat.completions.create(
             model=model,
             messages=messages,
             temperature=temperature,
             max_tokens=max_tokens
         )
-        return response.choices[0].message.content.strip(), getattr(response, 'usage', None)
+        usage = getattr(response, 'usage', None)
+        if span and usage is not None:
+            span.set_attribute("total_tokens", getattr(usage, 'total_tokens', None))
+        return response
+
+
+def get_chat_completion(messages, model, temperature, max_tokens):
+    try:
+        response = resilience.call(
+            "openai", _create_chat_completion, messages, model, temperature, max_tokens,
+            is_retryable=_is_retryable_error
+        )
+        usage = getattr(response, 'usage', None)
+        record_openai_usage(model, usage)
+        return response.choices[0].message.content.strip(), usage
+    except resilience.ServiceUnavailable:
+        raise
     except Exception as e:
         error_type = type(e).__name__
         if "AuthenticationError" in error_type:
@@ -80,10 +125,66 @@ def generate_tweet(transcript):
             max_tokens=OPENAI_MAX_TOKENS
         )
         tweet = clean_response(raw_response)
-        # Ensure tweet is within 280 characters
-        if len(tweet) > 280:
-            tweet = tweet[:275] + "..."
-        return tweet
+        if tweet_length.weighted_length(tweet) > tweet_length.MAX_WEIGHTED_LENGTH:
+            tweet = fit_tweet(tweet)
+        return tweet or None
     except RuntimeError as e:
+        # Return None rather than an error string, so it is never saved or posted as tweet text
         logger.error(f"Error generating tweet: {e}")
-        return f"[Error] {str(e)}"
+        return None
+
+
+def rewrite_tweet(tweet):
+    """
+    Reword an existing tweet for a near-duplicate video; much cheaper than generating from the transcript.
+    Returns None if the model failed or returned the tweet unchanged.
+    """
+    if not OPENAI_API_KEY:
+        logger.error("OPENAI_API_KEY not set in environment.")
+        return None
+    try:
+        raw_response, _ = get_chat_completion(
+            messages=[{"role": "user", "content": REWRITE_PROMPT_TEMPLATE.format(tweet=tweet)}],
+            model=OPENAI_MODEL,
+            temperature=OPENAI_TEMPERATURE,
+            max_tokens=OPENAI_MAX_TOKENS
+        )
+    except RuntimeError as e:
+        logger.error(f"Error rewriting tweet: {e}")
+        return None
+    rewritten = clean_response(raw_response)
+    if tweet_length.weighted_length(rewritten) > tweet_length.MAX_WEIGHTED_LENGTH:
+        rewritten = tweet_length.repair(rewritten)
+    if not rewritten or rewritten == tweet.strip():
+        return None
+    return rewritten
+
+
+def fit_tweet(tweet):
+    """
+    Shorten an over-length tweet: cut at a sentence boundary if that keeps most of it, otherwise ask the
+    model to shorten it once (TWEET_SHORTEN_RETRY), and fall back to a word-boundary cut.
+    """
+    length = tweet_length.weighted_length(tweet)
+    logger.warning(f"Generated tweet is {length} weighted characters, over {tweet_length.MAX_WEIGHTED_LENGTH}")
+    fitted = tweet_length.fit_at_sentence(tweet)
+    if fitted:
+        return fitted
+    if TWEET_SHORTEN_RETRY:
+        prompt = SHORTEN_PROMPT_TEMPLATE.format(
+            length=length, max_length=tweet_length.MAX_WEIGHTED_LENGTH - 10, tweet=tweet
+        )
+        try:
+            raw_response, _ = get_chat_completion(
+                messages=[{"role": "user", "content": prompt}],
+                model=OPENAI_MODEL,
+                temperature=OPENAI_TEMPERATURE,
+                max_tokens=OPENAI_MAX_TOKENS
+            )
+            shortened = clean_response(raw_response)
+            if tweet_length.is_valid(shortened):
+                return tweet_length.repair(shortened)
+            logger.warning("Shortened tweet is still over length; cutting at a word boundary")
+        except RuntimeError as e:
+            logger.error(f"Error shortening tweet: {e}")
+    return tweet_length.repair(tweet)
@@ -0,0 +1,220 @@
+# resilience.py
+"""
+Shared resilience layer for external services: a circuit breaker per service plus jittered
+exponential backoff limited by a retry budget.
+
+While a service's circuit is open, calls fail immediately with CircuitOpenError instead of
+waiting for timeouts, so pipeline runs during an outage finish in milliseconds.
+"""
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", 3))
+BACKOFF_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", 0.5))  # seconds
+BACKOFF_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", 8.0))  # seconds
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", 0.2))  # retries allowed per call made
+RETRY_BUDGET_MIN = float(os.getenv("RETRY_BUDGET_MIN", 10))  # retries always available after a quiet period
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))  # consecutive failures to open
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", 60.0))  # seconds open before a trial call
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+RETRIES = metrics.REGISTRY.register(metrics.Counter(
+    "external_call_retries_total",
+    "Retries of external calls, by service.",
+    labels=("service",)
+))
+REJECTED = metrics.REGISTRY.register(metrics.Counter(
+    "external_call_rejected_total",
+    "External calls rejected without being attempted because the circuit was open.",
+    labels=("service",)
+))
+
+
+class ServiceUnavailable(RuntimeError):
+    """An external service failed with transient errors and retries were exhausted."""
+
+    def __init__(self, service, message):
+        super().__init__(f"{service} unavailable: {message}")
+        self.service = service
+
+
+class CircuitOpenError(ServiceUnavailable):
+    """The service's circuit is open; the call was not attempted."""
+
+
+class CircuitBreaker:
+    def __init__(self, service, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a call may be attempted now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+                logger.info(f"Circuit for {self.service} half-open, allowing a trial call")
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"Circuit for {self.service} closed")
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        """End a call without an outcome for the circuit, freeing the half-open trial slot."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(f"Circuit for {self.service} opened after {self.failures} failures")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of calls, so retries cannot multiply load on a
+    struggling service. Each call deposits `ratio` tokens; each retry spends one.
+    """
+
+    def __init__(self, ratio=RETRY_BUDGET_RATIO, minimum=RETRY_BUDGET_MIN):
+        self.ratio = ratio
+        self.maximum = max(minimum, 1.0)
+        self.tokens = self.maximum
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.maximum, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+_breakers = {}
+_budgets = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(service):
+    with _registry_lock:
+        if service not in _breakers:
+            _breakers[service] = CircuitBreaker(service)
+            _budgets[service] = RetryBudget()
+        return _breakers[service]
+
+
+def _get_budget(service):
+    get_breaker(service)
+    return _budgets[service]
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE_DELAY, cap=BACKOFF_MAX_DELAY):
+    """Full-jitter exponential backoff for the given (1-based) retry attempt."""
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
+
+
+def is_transient_status(status_code):
+    return status_code in (408, 429) or 500 <= status_code < 600
+
+
+def is_transient_requests_error(e):
+    """Retry predicate for `requests`: connection errors, timeouts and 408/429/5xx responses."""
+    if isinstance(e, requests.exceptions.HTTPError) and e.response is not None:
+        return is_transient_status(e.response.status_code)
+    return isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+def call(service, func, *args, is_retryable=lambda e: True, max_attempts=None, **kwargs):
+    """
+    Call `func(*args, **kwargs)` through the service's circuit breaker, retrying transient failures.
+
+    Args:
+        service: Service name; one breaker and retry budget exist per name
+        func: Callable performing the external call
+        is_retryable: Predicate on the raised exception. Non-retryable errors are re-raised
+            unchanged and leave the circuit as it is: they neither count against it nor close it.
+        max_attempts: Overrides RETRY_MAX_ATTEMPTS
+
+    Raises:
+        CircuitOpenError: The circuit is open, the call was not attempted
+        ServiceUnavailable: Transient failures exhausted the attempts or the retry budget
+    """
+    breaker = get_breaker(service)
+    budget = _get_budget(service)
+    max_attempts = max_attempts or MAX_ATTEMPTS
+
+    if not breaker.allow():
+        REJECTED.inc(service=service)
+        raise CircuitOpenError(service, "circuit open")
+    budget.deposit()
+
+    attempt = 1
+    while True:
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e):
+                # Says nothing about the service's health; only a real success closes the circuit
+                breaker.release()
+                raise
+            breaker.record_failure()
+            if attempt >= max_attempts:
+                raise ServiceUnavailable(service, f"{type(e).__name__}: {e}") from e
+            if not budget.withdraw():
+                raise ServiceUnavailable(service, f"retry budget exhausted after {type(e).__name__}: {e}") from e
+            if not breaker.allow():
+                REJECTED.inc(service=service)
+                raise CircuitOpenError(service, f"circuit opened after {type(e).__name__}: {e}") from e
+            delay = backoff_delay(attempt)
+            logger.warning(f"{service} call failed ({type(e).__name__}: {e}), retry {attempt} in {delay:.2f}s")
+            RETRIES.inc(service=service)
+            time.sleep(delay)
+            attempt += 1
+        else:
+            breaker.record_success()
+            return result
+
+
+metrics.register_gauge(
+    "circuit_open",
+    "1 if the service's circuit breaker is open or half-open, 0 if closed.",
+    ("service",),
+    lambda: {(name,): int(b.state != CLOSED) for name, b in list(_breakers.items())}
+)
@@ -0,0 +1,47 @@
+# tests/conftest.py
+import os
+import tempfile
+
+# Module-level config is read at import time, so point everything at throwaway files first
+_tmp = tempfile.mkdtemp(prefix="yt2x-tests-")
+os.environ["DATABASE_PATH"] = os.path.join(_tmp, "default.db")
+os.environ["TRACE_DB_PATH"] = os.path.join(_tmp, "traces.db")
+os.environ["TRACING_ENABLED"] = "false"
+os.environ["COORDINATION_ENABLED"] = "false"
+
+import pytest
+
+import database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh, initialized database for one test."""
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "test.db"))
+    database.init_db()
+    return database
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Test client for the app, authenticated with a known token. Startup events are not run."""
+    from fastapi.testclient import TestClient
+
+    import main
+
+    monkeypatch.setattr(main, "SYSTEM_AUTH_TOKEN", "token")
+    return TestClient(main.app, headers={"Authorization": "Bearer token"})
+
+
+@pytest.fixture
+def add_video(db):
+    """Factory adding a video to a shared channel with the given status and tweet text; returns its ID."""
+    def add(url="https://youtu.be/a", status="pending", tweet_text=None):
+        channel_id = db.add_channel("handle", "https://www.youtube.com/@channel")
+        db.add_video(channel_id, url)
+        with db.get_db() as conn:
+            video_id = conn.execute("SELECT id FROM videos WHERE video_url = ?", (url,)).fetchone()[0]
+            conn.execute("UPDATE videos SET posted_status = ?, tweet_text = ? WHERE id = ?",
+                         (status, tweet_text, video_id))
+        return video_id
+    return add
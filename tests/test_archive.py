@@ -0,0 +1,27 @@
+def test_published_transcript_moves_to_cold_storage(db):
+    channel_id = db.add_channel("handle", "https://www.youtube.com/@channel")
+    db.add_videos(channel_id, ["https://youtu.be/a", "https://youtu.be/b"])
+    with db.get_db() as conn:
+        conn.execute("UPDATE videos SET transcript = 'published talk', posted_status = 'published' "
+                     "WHERE video_url = 'https://youtu.be/a'")
+        conn.execute("UPDATE videos SET transcript = 'pending talk' WHERE video_url = 'https://youtu.be/b'")
+        ids = dict(conn.execute("SELECT video_url, id FROM videos").fetchall())
+
+    assert db.archive_published_transcripts() == 1
+    assert db.archive_published_transcripts() == 0
+
+    with db.get_db() as conn:
+        hot = conn.execute("SELECT transcript FROM videos WHERE id = ?", (ids["https://youtu.be/a"],)).fetchone()[0]
+    assert hot is None
+    assert db.get_transcript(ids["https://youtu.be/a"]) == "published talk"
+    assert db.get_transcript(ids["https://youtu.be/b"]) == "pending talk"
+
+
+def test_incremental_vacuum_frees_pages(db):
+    db.incremental_vacuum()  # one-time conversion of the fresh database
+    channel_id = db.add_channel("handle", "https://www.youtube.com/@channel")
+    db.add_videos(channel_id, [f"https://youtu.be/{i}" for i in range(2000)])
+    with db.get_db() as conn:
+        conn.execute("DELETE FROM videos")
+
+    assert db.incremental_vacuum(max_pages=10000) > 0
@@ -0,0 +1,29 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_pipeline_benchmark_smoke(tmp_path):
+    output = tmp_path / "bench.json"
+    # A fresh interpreter, so the fakes' environment is in place before module-level config is read
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.pipeline_benchmark", "--channels", "1", "--videos-per-channel", "3",
+         "--process", "2", "--transcript-words", "50", "--output", str(output)],
+        cwd=ROOT, env={**os.environ, "TRACE_DB_PATH": str(tmp_path / "traces.db")},
+        check=True, capture_output=True, timeout=120
+    )
+
+    result = json.loads(output.read_text())
+    assert {"timestamp", "revision", "python", "platform", "config", "wall_time_s", "stages",
+            "fake_services"} <= set(result)
+    assert set(result["stages"]) == {"discovery", "db_insert", "transcript", "generate", "media", "post",
+                                     "db_update"}
+    assert set(result["stages"]["media"]) == {"calls", "items", "errors", "total_s", "throughput_per_s",
+                                              "p50_ms", "p95_ms", "p99_ms"}
+    assert result["stages"]["discovery"]["items"] == 3
+    assert result["stages"]["post"] == {**result["stages"]["post"], "calls": 2, "errors": 0}
+    assert result["fake_services"]["x"]["media_uploads"] == 2
+    assert result["fake_services"]["x"]["tweets"] == 2
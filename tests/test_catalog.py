@@ -0,0 +1,121 @@
+import gzip
+import io
+import json
+
+import pytest
+
+import catalog
+import dedup
+
+CHANNEL = {"type": "channel", "x_handle": "handle", "channel_url": "https://www.youtube.com/@channel"}
+TRANSCRIPT = " ".join(f"w{(i * 7919) % 10007}" for i in range(300))
+
+
+def video(url, **fields):
+    return {"type": "video", "channel_url": CHANNEL["channel_url"], "video_url": url, **fields}
+
+
+def ndjson(*records):
+    return io.BytesIO(b"".join(json.dumps(record).encode("utf-8") + b"\n" for record in records))
+
+
+def statuses(db):
+    with db.get_db() as conn:
+        return dict(conn.execute("SELECT video_url, posted_status FROM videos").fetchall())
+
+
+def test_round_trip_into_another_database(db, monkeypatch, tmp_path):
+    catalog.import_file(ndjson(
+        CHANNEL, video("https://youtu.be/a", tweet_text="Tweet", posted_status="published", transcript=TRANSCRIPT),
+        video("https://youtu.be/b")
+    ))
+    db.archive_published_transcripts()
+    exported = b"".join(catalog.iter_export(include_transcripts=True, compress=True))
+
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "copy.db"))
+    db.init_db()
+    stats = catalog.import_file(io.BytesIO(exported))
+
+    assert stats == {"channels_added": 1, "videos_added": 2, "videos_skipped": 0}
+    assert statuses(db) == {"https://youtu.be/a": "published", "https://youtu.be/b": "pending"}
+    assert [v["transcript"] for v in db.list_videos(columns=("transcript",))] == [TRANSCRIPT, None]
+
+
+def test_reimport_skips_existing_rows(db):
+    records = (CHANNEL, video("https://youtu.be/a"), video("https://youtu.be/b"))
+    assert catalog.import_file(ndjson(*records), chunk_size=1)["videos_added"] == 2
+
+    stats = catalog.import_file(ndjson(*records, video("https://youtu.be/c")), chunk_size=1)
+    assert stats == {"channels_added": 0, "videos_added": 1, "videos_skipped": 2}
+
+
+def test_videos_of_unknown_channels_are_skipped(db):
+    stats = catalog.import_file(ndjson({**video("https://youtu.be/a"), "channel_url": "https://www.youtube.com/@x"}))
+    assert stats == {"channels_added": 0, "videos_added": 0, "videos_skipped": 1}
+
+
+def test_invalid_line_rolls_back_everything(db):
+    # chunk_size=1 flushes the valid rows before the bad line is read
+    source = io.BytesIO(
+        ndjson(CHANNEL, video("https://youtu.be/a")).getvalue() + b"{not json\n"
+    )
+    with pytest.raises(ValueError, match="Line 3"):
+        catalog.import_file(source, chunk_size=1)
+    assert db.get_all_channels() == []
+    assert statuses(db) == {}
+
+
+def test_unknown_status_is_rejected(db):
+    source = ndjson(CHANNEL, video("https://youtu.be/a"), video("https://youtu.be/b", posted_status="bogus"))
+    with pytest.raises(ValueError, match="bogus"):
+        catalog.import_file(source)
+    assert statuses(db) == {}
+
+
+@pytest.mark.parametrize("record", [
+    video("https://youtu.be/b", title={"a": 1}),
+    video("https://youtu.be/b", transcript=5),
+    video("https://youtu.be/b", posted_status=["published"]),
+    {**CHANNEL, "x_handle": ["a"]},
+    video(["https://youtu.be/b"]),
+])
+def test_non_string_fields_are_rejected(db, record):
+    with pytest.raises(ValueError, match="Line 3: .* must be a string or null"):
+        catalog.import_file(ndjson(CHANNEL, video("https://youtu.be/a"), record))
+    assert statuses(db) == {}
+
+
+def test_done_is_not_a_status(db):
+    with pytest.raises(ValueError, match="done"):
+        catalog.import_file(ndjson(CHANNEL, video("https://youtu.be/a", posted_status="done")))
+
+
+def test_claim_statuses_are_resolved(db):
+    catalog.import_file(ndjson(
+        CHANNEL, video("https://youtu.be/a", posted_status="generating"),
+        video("https://youtu.be/b", posted_status="posting")
+    ))
+    assert statuses(db) == {"https://youtu.be/a": "pending", "https://youtu.be/b": "error"}
+
+
+def test_imported_transcripts_get_signatures(db):
+    catalog.import_file(ndjson(
+        CHANNEL, video("https://youtu.be/a", transcript=TRANSCRIPT, tweet_text="Tweet", posted_status="published"),
+        video("https://youtu.be/b")
+    ), chunk_size=1)
+    with db.get_db() as conn:
+        signed = conn.execute("SELECT video_id FROM transcript_signatures").fetchall()
+    assert signed == [(1,)]
+
+    db.add_video(1, "https://youtu.be/c")
+    with db.get_db() as conn:
+        video_id = conn.execute("SELECT id FROM videos WHERE video_url = 'https://youtu.be/c'").fetchone()[0]
+    assert dedup.find_near_duplicate(video_id, TRANSCRIPT)["video_id"] == 1
+
+
+def test_gzip_is_detected_and_corrupt_gzip_rejected(db):
+    data = ndjson(CHANNEL, video("https://youtu.be/a")).getvalue()
+    assert catalog.import_file(io.BytesIO(gzip.compress(data)))["videos_added"] == 1
+
+    with pytest.raises(ValueError, match="gzip"):
+        catalog.import_file(io.BytesIO(gzip.compress(data)[:-12]))
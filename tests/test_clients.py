@@ -0,0 +1,54 @@
+import threading
+import time
+
+import pytest
+
+import clients
+
+
+@pytest.fixture
+def counting_factory():
+    calls = []
+
+    def factory():
+        calls.append(threading.current_thread())
+        time.sleep(0.05)  # keep concurrent callers inside the build
+        return object()
+
+    clients.register("test-client", factory)
+    yield calls
+    clients.reset("test-client")
+    clients._factories.pop("test-client", None)
+
+
+def test_client_is_built_on_first_use_and_reused(counting_factory):
+    assert counting_factory == []
+    client = clients.get("test-client")
+    assert clients.get("test-client") is client
+    assert len(counting_factory) == 1
+
+
+def test_concurrent_first_use_builds_once(counting_factory):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(clients.get("test-client"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(counting_factory) == 1
+    assert len({id(client) for client in results}) == 1
+
+
+def test_reset_and_reregister_rebuild(counting_factory):
+    first = clients.get("test-client")
+    clients.reset("test-client")
+    assert clients.get("test-client") is not first
+    assert len(counting_factory) == 2
+
+    clients.register("test-client", lambda: "replacement")
+    assert clients.get("test-client") == "replacement"
+
+
+def test_unknown_client_raises_key_error():
+    with pytest.raises(KeyError, match="no-such-client"):
+        clients.get("no-such-client")
@@ -0,0 +1,118 @@
+import time
+
+import pytest
+
+import coordination
+
+SHARDS = 8
+TTL = 30
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return coordination.SQLiteBackend(str(tmp_path / "coordination.db"))
+
+
+def node(backend, node_id, database_id="shared"):
+    return coordination.Coordinator(backend, node_id, SHARDS, TTL, database_id=database_id)
+
+
+def test_video_claim_is_compare_and_set(db, add_video):
+    video_id = add_video()
+
+    assert db.claim_video(video_id, "node-a", "posting")
+    assert not db.claim_video(video_id, "node-b", "posting")
+
+    # Only the holder can release it
+    db.release_video_claim(video_id, "node-b", "pending")
+    assert db.get_video_summary(video_id)["posted_status"] == "posting"
+    db.release_video_claim(video_id, "node-a", "published")
+    assert db.get_video_summary(video_id)["posted_status"] == "published"
+    assert not db.claim_video(video_id, "node-b", "posting")
+
+
+def test_stale_claims_are_released(db, add_video, clock):
+    video_id = add_video()
+    assert db.claim_video(video_id, "node-a", "generating")
+    clock.now += 100
+
+    assert db.release_stale_claims(timeout=60) == 1
+    assert db.get_video_summary(video_id)["posted_status"] == "pending"
+    assert db.claim_video(video_id, "node-a", "posting")
+    clock.now += 100
+    db.release_stale_claims(timeout=60)
+    # The tweet may be out already, so a stale posting claim is never retried
+    assert db.get_video_summary(video_id)["posted_status"] == "error"
+
+
+def test_database_id_is_stable(db):
+    assert db.get_database_id() == db.get_database_id()
+    db.init_db()
+    assert len(db.get_database_id()) == 32
+
+
+def test_single_node_owns_every_shard(backend, clock):
+    a = node(backend, "a")
+    assert a.heartbeat() == frozenset(range(SHARDS))
+    assert a.owned_shards == frozenset(range(SHARDS))
+
+
+def test_owned_shards_expire_without_heartbeat(backend, clock):
+    a = node(backend, "a")
+    a.heartbeat()
+    clock.now += TTL - 1
+    assert len(a.owned_shards) == SHARDS
+    clock.now += 1
+    assert a.owned_shards == frozenset()
+
+
+def test_expired_leases_are_taken_over(backend, clock):
+    a, b = node(backend, "a"), node(backend, "b")
+    a.heartbeat()
+    assert b.heartbeat() == frozenset()
+
+    clock.now += TTL
+    assert b.heartbeat() == frozenset(range(SHARDS))
+    # a comes back and has to wait for its fair share to be handed back
+    assert a.heartbeat() == frozenset()
+
+
+def test_rebalances_when_a_node_joins_and_leaves(backend, clock):
+    a, b = node(backend, "a"), node(backend, "b")
+    a.heartbeat()
+    b.heartbeat()
+
+    clock.now += 1
+    assert len(a.heartbeat()) == SHARDS // 2
+    assert len(b.heartbeat()) == SHARDS // 2
+    assert a.owned_shards.isdisjoint(b.owned_shards)
+
+    a.leave()
+    assert a.owned_shards == frozenset()
+    assert b.heartbeat() == frozenset(range(SHARDS))
+
+
+def test_node_with_another_database_gets_no_shards(backend, clock):
+    a, b = node(backend, "a"), node(backend, "b", database_id="local")
+    a.heartbeat()
+    clock.now += TTL
+    # a's leases expired, but b's claims would not exclude a's
+    assert b.heartbeat() == frozenset()
+    state = b.get_state()
+    assert {n["node_id"]: n["database_id"] for n in state["nodes"]} == {"a": "shared", "b": "local"}
+    assert state["unowned_shards"] == SHARDS
@@ -0,0 +1,90 @@
+import importlib
+
+import dedup
+
+# Long enough that a small edit only changes a few of its shingles, as with a re-upload of the same talk
+TRANSCRIPT = " ".join(f"w{(i * 7919) % 10007}" for i in range(1000))
+NEAR_TRANSCRIPT = TRANSCRIPT.replace("w0 ", "intro ", 1).upper()
+OTHER_TRANSCRIPT = " ".join(f"x{(i * 31) % 10007}" for i in range(1000))
+
+
+def test_simhash_is_close_for_near_duplicates():
+    assert dedup.hamming_distance(dedup.simhash(TRANSCRIPT), dedup.simhash(NEAR_TRANSCRIPT)) <= 3
+    assert dedup.hamming_distance(dedup.simhash(TRANSCRIPT), dedup.simhash(OTHER_TRANSCRIPT)) > 3
+
+
+def test_finds_published_near_duplicate(db, add_video):
+    original = add_video("https://youtu.be/a", status="published", tweet_text="Original tweet")
+    assert dedup.find_near_duplicate(original, TRANSCRIPT) is None
+
+    video_id = add_video("https://youtu.be/b")
+    duplicate = dedup.find_near_duplicate(video_id, NEAR_TRANSCRIPT)
+    assert duplicate["video_id"] == original
+    assert duplicate["tweet_text"] == "Original tweet"
+    assert duplicate["posted_status"] == "published"
+
+
+def test_finds_pending_original_only_with_tweet_text(db, add_video):
+    original = add_video("https://youtu.be/a")
+    dedup.find_near_duplicate(original, TRANSCRIPT)
+
+    video_id = add_video("https://youtu.be/b")
+    assert dedup.find_near_duplicate(video_id, NEAR_TRANSCRIPT) is None
+
+    db.update_video_transcript(original, TRANSCRIPT, "Generated tweet")
+    assert dedup.find_near_duplicate(video_id, NEAR_TRANSCRIPT)["video_id"] == original
+
+
+def test_ignores_duplicate_and_failed_originals(db, add_video):
+    for url, status in (("https://youtu.be/a", "duplicate"), ("https://youtu.be/b", "error")):
+        dedup.find_near_duplicate(add_video(url, status=status, tweet_text="Tweet"), TRANSCRIPT)
+
+    assert dedup.find_near_duplicate(add_video("https://youtu.be/c"), NEAR_TRANSCRIPT) is None
+
+
+def test_unrelated_transcript_is_not_a_duplicate(db, add_video):
+    original = add_video("https://youtu.be/a", status="published", tweet_text="Original tweet")
+    dedup.find_near_duplicate(original, TRANSCRIPT)
+
+    assert dedup.find_near_duplicate(add_video("https://youtu.be/b"), OTHER_TRANSCRIPT) is None
+
+
+def test_reuse_rewords_the_original_tweet(db, add_video, monkeypatch):
+    import main
+
+    monkeypatch.setattr(dedup, "NEAR_DUPLICATE_ACTION", "reuse")
+    monkeypatch.setattr(main, "rewrite_tweet", lambda tweet: f"Reworded: {tweet}")
+    original = add_video("https://youtu.be/a", status="published", tweet_text="Original tweet")
+    dedup.find_near_duplicate(original, TRANSCRIPT)
+    video_id = add_video("https://youtu.be/b")
+
+    response, status = main._generate_for_video(
+        {"id": video_id, "video_url": "https://youtu.be/b", "transcript": NEAR_TRANSCRIPT}
+    )
+    assert status == "pending"
+    assert response["duplicate_of"] == original
+    assert db.get_video_summary(video_id)["tweet_text"] == "Reworded: Original tweet"
+
+
+def test_backfill_signs_hot_and_archived_transcripts(db, add_video):
+    archived = add_video("https://youtu.be/a")
+    db.update_video_transcript(archived, TRANSCRIPT, "Original tweet")
+    db.update_video_status(archived, "published")
+    db.archive_published_transcripts()
+    hot = add_video("https://youtu.be/b")
+    db.update_video_transcript(hot, OTHER_TRANSCRIPT, "Other tweet")
+    add_video("https://youtu.be/c")  # no transcript, nothing to sign
+
+    assert dedup.backfill_signatures(batch_size=1) == 2
+    assert dedup.backfill_signatures() == 0
+    video_id = add_video("https://youtu.be/d")
+    assert dedup.find_near_duplicate(video_id, NEAR_TRANSCRIPT)["video_id"] == archived
+
+
+def test_unknown_action_falls_back_to_skip(monkeypatch):
+    monkeypatch.setenv("NEAR_DUPLICATE_ACTION", "Rewrite")
+    try:
+        assert importlib.reload(dedup).NEAR_DUPLICATE_ACTION == "skip"
+    finally:
+        monkeypatch.delenv("NEAR_DUPLICATE_ACTION")
+        importlib.reload(dedup)
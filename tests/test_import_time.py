@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Generous: a cold `import main` takes well under a second; this only catches an SDK or client built at import
+IMPORT_BUDGET_S = 10
+
+CHECK = """
+import sys
+import clients
+import main
+eager = [name for name in ("openai", "tweepy") if name in sys.modules]
+assert not eager, f"imported eagerly: {eager}"
+assert not clients._instances, f"clients built at import: {sorted(clients._instances)}"
+assert {"youtube", "openai", "x_api_v1", "x_client"} <= set(clients._factories)
+"""
+
+
+def test_import_main_is_lazy_and_fast(tmp_path):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", CHECK], cwd=ROOT, capture_output=True, text=True, timeout=IMPORT_BUDGET_S * 3,
+        env={**os.environ, "DATABASE_PATH": str(tmp_path / "test.db"), "TRACE_DB_PATH": str(tmp_path / "traces.db")}
+    )
+    elapsed = time.perf_counter() - start
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert elapsed < IMPORT_BUDGET_S
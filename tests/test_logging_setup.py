@@ -0,0 +1,61 @@
+import json
+import logging
+import queue
+
+import pytest
+
+import logging_setup
+
+
+@pytest.fixture
+def isolated_root():
+    """Restore the root handlers and levels that setup_logging() replaces."""
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield
+    logging_setup.shutdown_logging()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+    for name in ("test.quiet", "test.verbose"):
+        logging.getLogger(name).setLevel(logging.NOTSET)
+
+
+def test_message_and_extra_fields_are_truncated_before_enqueueing():
+    log_queue = queue.SimpleQueue()
+    handler = logging_setup.TruncatingQueueHandler(log_queue, 5)
+    record = logging.makeLogRecord({"msg": "%s!", "args": ("x" * 10,), "payload": "y" * 8, "count": 123456789})
+
+    handler.handle(record)
+    queued = log_queue.get_nowait()
+    assert queued.msg == "xxxxx... [6 chars truncated]"
+    assert queued.args is None
+    assert queued.payload == "yyyyy... [3 chars truncated]"
+    assert queued.count == 123456789
+    assert record.payload == "y" * 8  # the caller's record is left alone
+
+
+def test_per_module_levels_are_parsed():
+    assert logging_setup._parse_levels(" youtube=debug, x_handler = WARNING,,broken,=INFO") == {
+        "youtube": "DEBUG", "x_handler": "WARNING",
+    }
+
+
+def test_setup_applies_levels_and_shutdown_flushes_the_queue(isolated_root, monkeypatch, capsys):
+    monkeypatch.setattr(logging_setup, "LOG_LEVEL", "INFO")
+    monkeypatch.setattr(logging_setup, "LOG_LEVELS", "test.quiet=ERROR,test.verbose=DEBUG")
+    monkeypatch.setattr(logging_setup, "LOG_FORMAT", "json")
+    logging_setup.shutdown_logging()
+    logging_setup.setup_logging()
+
+    logging.getLogger("test.quiet").warning("dropped")
+    logging.getLogger("test.verbose").debug("kept %s", "debug", extra={"video_id": 7})
+    logging.getLogger("test.other").debug("dropped")
+    logging_setup.shutdown_logging()
+
+    entries = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+    assert [(e["logger"], e["level"], e["msg"]) for e in entries] == [("test.verbose", "DEBUG", "kept debug")]
+    assert entries[0]["video_id"] == 7
+    assert logging_setup._listener is None
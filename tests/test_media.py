@@ -0,0 +1,83 @@
+import asyncio
+import threading
+
+import pytest
+
+import main
+import media
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = {"prefetch_thumbnail": [], "prepare_media": [], "discard_thumbnail": []}
+    monkeypatch.setattr(media, "prefetch_thumbnail",
+                        lambda video_url, *args: calls["prefetch_thumbnail"].append(video_url))
+    monkeypatch.setattr(media, "prepare_media", lambda video_id, *args: calls["prepare_media"].append(video_id))
+    monkeypatch.setattr(media, "discard_thumbnail", lambda video_url: calls["discard_thumbnail"].append(video_url))
+    return calls
+
+
+def generate(monkeypatch, response, status):
+    monkeypatch.setattr(main, "_generate_for_video", lambda video: (response, status))
+    return asyncio.run(main.generate_tweets())
+
+
+def test_media_is_prepared_after_a_tweet_is_generated(db, add_video, monkeypatch, calls):
+    video_id = add_video()
+    generate(monkeypatch, {"status": "success", "processed": 1, "video_id": video_id}, "pending")
+    assert calls == {"prefetch_thumbnail": ["https://youtu.be/a"], "prepare_media": [video_id],
+                     "discard_thumbnail": []}
+    assert db.get_video_summary(video_id)["posted_status"] == "pending"
+
+
+def test_thumbnail_is_fetched_while_the_tweet_is_generated(db, add_video, monkeypatch, calls):
+    video_id = add_video()
+    fetching = threading.Event()
+    monkeypatch.setattr(media, "prefetch_thumbnail", lambda *args: fetching.set())
+
+    def generate_while_fetching(video):
+        assert fetching.wait(5), "thumbnail fetch did not start during generation"
+        return {"status": "success", "processed": 1, "video_id": video_id}, "pending"
+
+    monkeypatch.setattr(main, "_generate_for_video", generate_while_fetching)
+    asyncio.run(main.generate_tweets())
+    assert calls["prepare_media"] == [video_id]
+
+
+def test_no_upload_without_a_tweet(db, add_video, monkeypatch, calls):
+    video_id = add_video()
+    generate(monkeypatch, {"status": "success", "processed": 0, "video_id": video_id}, "pending")
+    assert calls["prepare_media"] == []
+    assert calls["discard_thumbnail"] == ["https://youtu.be/a"]
+
+
+def test_failed_generation_discards_the_thumbnail(db, add_video, monkeypatch, calls):
+    video_id = add_video()
+
+    def fail(video):
+        raise RuntimeError("generation failed")
+
+    monkeypatch.setattr(main, "_generate_for_video", fail)
+    with pytest.raises(RuntimeError):
+        asyncio.run(main.generate_tweets())
+    assert calls["prepare_media"] == []
+    assert calls["discard_thumbnail"] == ["https://youtu.be/a"]
+    assert db.get_video_summary(video_id)["posted_status"] == "pending"
+
+
+def test_duplicate_discards_the_thumbnail(db, add_video, monkeypatch, calls):
+    video_id = add_video()
+    generate(monkeypatch, {"status": "success", "processed": 0, "video_id": video_id, "duplicate_of": 1}, "duplicate")
+    assert calls["prepare_media"] == []
+    assert calls["discard_thumbnail"] == ["https://youtu.be/a"]
+    assert db.get_video_summary(video_id)["posted_status"] == "duplicate"
+
+
+@pytest.mark.parametrize("success, status", [(True, "published"), (False, "error")])
+def test_posting_discards_the_thumbnail_when_done(db, add_video, monkeypatch, calls, success, status):
+    video_id = add_video(tweet_text="A tweet")
+    monkeypatch.setattr(main, "post_tweet", lambda text, media_id=None: success)
+
+    assert asyncio.run(main.post_to_x())["posted"] == int(success)
+    assert db.get_video_summary(video_id)["posted_status"] == status
+    assert calls["discard_thumbnail"] == ["https://youtu.be/a"]
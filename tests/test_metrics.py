@@ -0,0 +1,83 @@
+import pytest
+
+import metrics
+
+
+def test_histogram_buckets_accumulate_up_to_inf():
+    histogram = metrics.Histogram("latency_seconds", "Latency.", labels=("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0, 3.0):
+        histogram.observe(value, stage="post")
+
+    assert histogram.render() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{stage="post",le="0.1"} 2',  # a value on a bound counts in that bucket
+        'latency_seconds_bucket{stage="post",le="1"} 3',
+        'latency_seconds_bucket{stage="post",le="+Inf"} 5',
+        'latency_seconds_sum{stage="post"} 5.65',
+        'latency_seconds_count{stage="post"} 5',
+    ]
+
+
+def test_histogram_time_observes_the_block():
+    histogram = metrics.Histogram("block_seconds", "Block.", buckets=(60.0,))
+    with pytest.raises(RuntimeError):
+        with histogram.time():
+            raise RuntimeError
+    assert histogram.render()[-1] == "block_seconds_count 1"
+
+
+def test_counter_labels_are_kept_apart_and_escaped():
+    counter = metrics.Counter("calls_total", "Calls.", labels=("service", "operation"))
+    counter.inc(service="x", operation="post")
+    counter.inc(2, service="x", operation="post")
+    counter.inc(service='say "hi"\\\n', operation="post")
+
+    assert counter.value(service="x", operation="post") == 3
+    assert counter.render()[2:] == [
+        'calls_total{service="say \\"hi\\"\\\\\\n",operation="post"} 1',
+        'calls_total{service="x",operation="post"} 3',
+    ]
+
+
+def test_callback_gauge_is_computed_on_render():
+    values = {("a",): 1}
+    gauge = metrics.CallbackGauge("queue_depth", "Depth.", ("queue",), lambda: values)
+    values[("a",)] = 0.5
+    assert gauge.render()[2:] == ['queue_depth{queue="a"} 0.5']
+
+
+def test_track_external_call_records_outcome(db):
+    with metrics.track_external_call("svc-test", "ok"):
+        pass
+    with metrics.track_external_call("svc-test", "marked") as call:
+        call.mark_error()
+    with pytest.raises(ValueError):
+        with metrics.track_external_call("svc-test", "raised"):
+            raise ValueError
+
+    rendered = metrics.render()
+    assert 'external_call_duration_seconds_count{service="svc-test",operation="ok",outcome="success"} 1' in rendered
+    assert 'external_call_duration_seconds_count{service="svc-test",operation="marked",outcome="error"} 1' in rendered
+    assert 'external_call_duration_seconds_count{service="svc-test",operation="raised",outcome="error"} 1' in rendered
+
+
+def test_metrics_endpoint_requires_auth(db, client):
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": ""}).status_code in (401, 403)
+
+
+def test_metrics_endpoint_scrape(db, client):
+    db.add_channel("handle", "https://www.youtube.com/@channel")
+    db.add_video(1, "https://youtu.be/a")
+    metrics.record_cache_lookup("scrape-test", True)
+    metrics.record_cache_lookup("scrape-test", False)
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert "# TYPE db_query_duration_seconds histogram" in body
+    assert 'db_query_duration_seconds_bucket{query="add_channel",le="+Inf"}' in body
+    assert 'videos_by_status{status="pending"} 1' in body
+    assert 'cache_hit_ratio{cache="scrape-test"} 0.5' in body
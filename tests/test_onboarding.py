@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+import onboarding
+import resilience
+
+
+class FakeExtractor:
+    def __init__(self, uploads_error=None):
+        self.uploads_error = uploads_error
+
+    def get_channel_id_from_url(self, channel_url):
+        return "UC" + channel_url.rsplit("@", 1)[-1]
+
+    def get_uploads_playlist_ids(self, channel_ids):
+        if self.uploads_error:
+            raise self.uploads_error
+        return {channel_id: "UU" + channel_id[2:] for channel_id in channel_ids}
+
+    def get_playlist_videos(self, playlist_id):
+        return [f"https://www.youtube.com/watch?v={playlist_id}-{i}" for i in range(3)]
+
+
+CHANNELS = [
+    {"x_handle": "one", "channel_url": "https://www.youtube.com/@one"},
+    {"x_handle": "two", "channel_url": "https://www.youtube.com/@two"},
+]
+
+
+def test_run_job_inserts_and_backfills_channels(db):
+    job_id = onboarding.create_job(CHANNELS)
+    onboarding.run_job(job_id, FakeExtractor())
+
+    job = onboarding.get_job(job_id)
+    assert job["status"] == "completed"
+    assert job["summary"] == {"done": 2}
+    assert [c["videos_added"] for c in job["channels"]] == [3, 3]
+
+
+def test_uploads_lookup_outage_marks_channels_as_error(db):
+    job_id = onboarding.create_job(CHANNELS)
+    onboarding.run_job(job_id, FakeExtractor(resilience.ServiceUnavailable("youtube", "circuit open")))
+
+    job = onboarding.get_job(job_id)
+    assert job["status"] == "completed"
+    assert job["summary"] == {"error": 2}
+    assert all("youtube unavailable" in c["error"] for c in job["channels"])
+    assert db.get_all_channels() == []
+
+
+def test_parse_channel_list_reads_csv_and_json():
+    csv_content = b"x_handle,channel_url\n one , https://www.youtube.com/@one\ntwo,https://www.youtube.com/@two\n"
+    assert onboarding.parse_channel_list(csv_content, "channels.csv") == CHANNELS
+    json_content = json.dumps({"channels": CHANNELS + CHANNELS[:1]})  # repeated URLs are dropped
+    assert onboarding.parse_channel_list(json_content) == CHANNELS
+
+
+@pytest.mark.parametrize("content", [
+    b"123",
+    b'{"channels": 5}',
+    b'"channels"',
+    b'[{"x_handle": 5, "channel_url": "u"}]',
+    b'[{"x_handle": "a", "channel_url": ["u"]}]',
+    b'[{"x_handle": "a"}]',
+    b"[1]",
+    b"[not json",
+])
+def test_parse_channel_list_rejects_malformed_content(content):
+    with pytest.raises(ValueError):
+        onboarding.parse_channel_list(content, "channels.json")
@@ -0,0 +1,107 @@
+import pytest
+import requests
+
+import resilience
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setattr(resilience, "_budgets", {})
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt: 0)
+
+
+class Flaky:
+    def __init__(self, errors, result="ok"):
+        self.errors = list(errors)
+        self.result = result
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.result
+
+
+def test_retries_transient_errors_then_succeeds():
+    func = Flaky([TimeoutError(), TimeoutError()])
+    assert resilience.call("svc", func, max_attempts=3) == "ok"
+    assert func.calls == 3
+    assert resilience.get_breaker("svc").state == resilience.CLOSED
+
+
+def test_raises_service_unavailable_after_max_attempts():
+    func = Flaky([TimeoutError()] * 5)
+    with pytest.raises(resilience.ServiceUnavailable):
+        resilience.call("svc", func, max_attempts=2)
+    assert func.calls == 2
+
+
+def test_circuit_opens_after_threshold_and_rejects_calls():
+    breaker = resilience.get_breaker("svc")
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(resilience.ServiceUnavailable):
+            resilience.call("svc", Flaky([TimeoutError()]), max_attempts=1)
+    assert breaker.state == resilience.OPEN
+
+    func = Flaky([])
+    with pytest.raises(resilience.CircuitOpenError):
+        resilience.call("svc", func)
+    assert func.calls == 0
+
+
+def _open_then_half_open(breaker):
+    breaker.state = resilience.OPEN
+    breaker.opened_at = 0.0
+    breaker.failures = breaker.failure_threshold
+
+
+def test_half_open_closes_only_on_success():
+    breaker = resilience.get_breaker("svc")
+    _open_then_half_open(breaker)
+    assert resilience.call("svc", Flaky([])) == "ok"
+    assert breaker.state == resilience.CLOSED
+    assert breaker.failures == 0
+
+
+def test_half_open_trial_failure_reopens():
+    breaker = resilience.get_breaker("svc")
+    _open_then_half_open(breaker)
+    with pytest.raises(resilience.ServiceUnavailable):
+        resilience.call("svc", Flaky([TimeoutError()]), max_attempts=1)
+    assert breaker.state == resilience.OPEN
+
+
+def test_non_retryable_error_leaves_half_open_circuit_unchanged():
+    breaker = resilience.get_breaker("svc")
+    _open_then_half_open(breaker)
+    func = Flaky([ValueError("bad request")])
+    with pytest.raises(ValueError):
+        resilience.call("svc", func, is_retryable=lambda e: not isinstance(e, ValueError))
+    assert func.calls == 1
+    assert breaker.state == resilience.HALF_OPEN
+    # The trial slot is free again, and the next real success closes the circuit
+    assert resilience.call("svc", Flaky([])) == "ok"
+    assert breaker.state == resilience.CLOSED
+
+
+def test_non_retryable_error_does_not_reset_failure_count():
+    breaker = resilience.get_breaker("svc")
+    with pytest.raises(resilience.ServiceUnavailable):
+        resilience.call("svc", Flaky([TimeoutError()]), max_attempts=1)
+    with pytest.raises(ValueError):
+        resilience.call("svc", Flaky([ValueError()]), is_retryable=lambda e: False)
+    assert breaker.failures == 1
+
+
+def test_create_tweet_is_not_retried_after_the_request_was_sent():
+    x_handler = pytest.importorskip("x_handler")
+    pytest.importorskip("tweepy")
+    from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+    assert not x_handler._is_retryable_post_error(requests.exceptions.ReadTimeout())
+    assert not x_handler._is_retryable_post_error(requests.exceptions.ConnectionError("Connection aborted."))
+    assert x_handler._is_retryable_post_error(requests.exceptions.ConnectTimeout())
+    refused = MaxRetryError(None, "/2/tweets", NewConnectionError(None, "Connection refused"))
+    assert x_handler._is_retryable_post_error(requests.exceptions.ConnectionError(refused))
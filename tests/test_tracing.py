@@ -0,0 +1,83 @@
+# tests/test_tracing.py
+import sqlite3
+import threading
+import time
+
+from tracing import SQLiteSpanExporter, Span
+
+
+def _span(start_time):
+    span = Span("t" * 32, None, "stage", {})
+    span.start_time = start_time
+    span.duration_ms = 1.0
+    return span
+
+
+def _count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM spans").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_prune_drops_spans_past_max_age(tmp_path):
+    path = str(tmp_path / "traces.db")
+    exporter = SQLiteSpanExporter(path, batch_size=100, max_age_days=1, max_spans=0, prune_every=1)
+    exporter.export(_span(time.time() - 3 * 86400))
+    exporter.export(_span(time.time()))
+    exporter.flush()
+    assert _count(path) == 1
+
+
+def test_prune_keeps_newest_max_spans(tmp_path):
+    path = str(tmp_path / "traces.db")
+    exporter = SQLiteSpanExporter(path, batch_size=1000, max_age_days=0, max_spans=10, prune_every=5)
+    now = time.time()
+    for i in range(25):
+        exporter.export(_span(now + i))
+    exporter.flush()
+    spans = exporter.query("SELECT start_time FROM spans ORDER BY start_time")
+    assert len(spans) == 10
+    assert spans[0]["start_time"] == now + 15
+
+
+def test_batches_are_written_off_the_exporting_thread(tmp_path, monkeypatch):
+    exporter = SQLiteSpanExporter(str(tmp_path / "traces.db"), batch_size=2)
+    writers = []
+    monkeypatch.setattr(exporter, "_write", lambda batch: writers.append((threading.current_thread(), len(batch))))
+    exporter.export(_span(time.time()))
+    exporter.export(_span(time.time()))
+    exporter.flush()
+    assert writers == [(exporter._writer, 2)]
+    assert writers[0][0] is not threading.current_thread()
+
+
+def test_failed_write_closes_connection_and_keeps_writer(tmp_path, monkeypatch):
+    path = str(tmp_path / "traces.db")
+    exporter = SQLiteSpanExporter(path, batch_size=100)
+    closed = []
+
+    class FailingConnection:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def executemany(self, *args):
+            raise sqlite3.OperationalError("disk I/O error")
+
+        def close(self):
+            closed.append(True)
+
+    connect = exporter._connect
+    monkeypatch.setattr(exporter, "_connect", FailingConnection)
+    exporter.export(_span(time.time()))
+    exporter.flush()
+    assert closed == [True]
+
+    monkeypatch.setattr(exporter, "_connect", connect)
+    exporter.export(_span(time.time()))
+    exporter.flush()
+    assert _count(path) == 1
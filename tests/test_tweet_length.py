@@ -0,0 +1,113 @@
+import unicodedata
+
+import pytest
+
+import tweet_length
+from tweet_length import MAX_WEIGHTED_LENGTH, repair, weighted_length
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("hello", 5),
+    ("", 0),
+    ("café", 4),
+    ("“quoted” — dash", 15),  # general punctuation weighs 1
+    ("日本語", 6),
+    ("\U0001F600", 2),
+    ("\U0001F44D\U0001F3FD", 2),  # skin tone modifier
+    ("\U0001F468‍\U0001F469‍\U0001F467", 2),  # ZWJ family
+    ("\U0001F1FA\U0001F1F8", 2),  # flag
+    ("1️⃣", 2),  # keycap
+    ("❤️", 2),
+])
+def test_weighted_length(text, expected):
+    assert weighted_length(text) == expected
+
+
+def test_urls_count_as_23():
+    assert weighted_length("https://example.com/" + "a" * 100) == 23
+    assert weighted_length("see www.example.com/path.") == 4 + 23 + 1
+    assert weighted_length("read example.io now") == 5 + 23 + 4
+
+
+def test_domain_must_end_at_the_tld():
+    assert weighted_length("example.community") == len("example.community")
+    assert weighted_length("example.co-op") == len("example.co-op")
+    assert weighted_length("example.com/community") == 23
+
+
+def test_text_is_nfc_normalized():
+    decomposed = unicodedata.normalize("NFD", "café")
+    assert len(decomposed) == 5
+    assert weighted_length(decomposed) == 4
+
+
+def test_is_valid():
+    assert tweet_length.is_valid("a" * MAX_WEIGHTED_LENGTH)
+    assert not tweet_length.is_valid("a" * (MAX_WEIGHTED_LENGTH + 1))
+    assert not tweet_length.is_valid("日" * 141)
+    assert not tweet_length.is_valid("   ")
+
+
+def test_repair_keeps_text_that_fits():
+    assert repair("  Short tweet.  ") == "Short tweet."
+
+
+def test_repair_cuts_at_sentence_boundary():
+    first = "First sentence is fairly long and makes the main point of the video clear. " * 2
+    text = first + "Second sentence " + "goes on " * 40 + "."
+    repaired = repair(text)
+    assert repaired == first.strip()
+    assert weighted_length(repaired) <= MAX_WEIGHTED_LENGTH
+
+
+def test_repair_falls_back_to_word_boundary_with_ellipsis():
+    text = "Short. " + "word " * 100
+    repaired = repair(text)
+    assert repaired.endswith(tweet_length.ELLIPSIS)
+    assert weighted_length(repaired) <= MAX_WEIGHTED_LENGTH
+    assert repaired[:-len(tweet_length.ELLIPSIS)].endswith("word")
+
+
+def test_repair_keeps_line_breaks():
+    sentences = "First line is long enough to count as a real sentence here.\nSecond line also makes a point.\n\n"
+    assert repair(sentences + "Last " * 60 + ".").startswith(sentences.strip())
+    assert "\n" in repair(sentences.strip())
+
+    words = "Line one\nline two " + "word " * 100
+    assert repair(words).startswith("Line one\nline two word")
+
+
+def test_repair_never_splits_urls():
+    url = "https://example.com/" + "x" * 60
+    text = ("word " * 50) + url + " " + ("tail " * 20)
+    repaired = repair(text)
+    assert weighted_length(repaired) <= MAX_WEIGHTED_LENGTH
+    assert url in repaired
+
+
+def test_repair_cuts_cjk_without_spaces():
+    repaired = repair("日" * 200)
+    assert weighted_length(repaired) <= MAX_WEIGHTED_LENGTH
+    assert repaired == "日" * 138 + tweet_length.ELLIPSIS
+
+
+def test_repair_of_empty_text():
+    assert repair(None) == ""
+    assert repair("") == ""
+
+
+@pytest.mark.parametrize("tweet_text, warned", [("Cafe\u0301 tweet  ", False), ("word " * 100, True)])
+def test_post_warns_only_when_the_tweet_was_too_long(db, add_video, monkeypatch, caplog, tweet_text, warned):
+    import asyncio
+
+    import main
+    import media
+
+    video_id = add_video(tweet_text=tweet_text)
+    monkeypatch.setattr(media, "prepare_media", lambda *args: None)
+    monkeypatch.setattr(media, "discard_thumbnail", lambda video_url: None)
+    monkeypatch.setattr(main, "post_tweet", lambda text, media_id=None: True)
+
+    asyncio.run(main.post_to_x())
+    assert db.get_video_summary(video_id)["tweet_text"] == repair(tweet_text)
+    assert ("Shortened tweet" in caplog.text) is warned
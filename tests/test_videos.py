@@ -0,0 +1,84 @@
+import pytest
+
+
+@pytest.fixture
+def videos(db):
+    """25 videos over two channels; every third one published."""
+    channels = [db.add_channel(f"handle{i}", f"https://www.youtube.com/@channel{i}") for i in range(2)]
+    for i in range(25):
+        db.add_video(channels[i % 2], f"https://youtu.be/{i}", title=f"Video {i}")
+    with db.get_db() as conn:
+        conn.execute("UPDATE videos SET posted_status = 'published', transcript = 'talk' WHERE id % 3 = 0")
+    return channels
+
+
+def page_through(db, **filters):
+    ids = []
+    after_id = 0
+    while True:
+        page = db.list_videos(after_id=after_id, limit=4, **filters)
+        ids.extend(video["id"] for video in page)
+        if len(page) < 4:
+            return ids
+        after_id = page[-1]["id"]
+
+
+def test_keyset_pages_cover_every_video_once(db, videos):
+    assert page_through(db) == list(range(1, 26))
+
+
+def test_filters(db, videos):
+    assert page_through(db, status="published") == list(range(3, 26, 3))
+    assert page_through(db, channel_id=videos[1]) == list(range(2, 26, 2))
+    assert page_through(db, status="published", channel_id=videos[1]) == [6, 12, 18, 24]
+
+
+def test_rows_inserted_behind_the_cursor_are_not_repeated(db, videos):
+    first = db.list_videos(limit=10)
+    db.add_video(videos[0], "https://youtu.be/new")
+    rest = db.list_videos(after_id=first[-1]["id"], limit=100)
+    assert [v["id"] for v in first + rest] == list(range(1, 27))
+
+
+def test_projection(db, videos):
+    video = db.list_videos(limit=1, columns=("title",))[0]
+    assert video == {"id": 1, "title": "Video 0"}
+    assert "transcript" not in db.list_videos(limit=1)[0]
+    with pytest.raises(ValueError):
+        db.list_videos(columns=("password",))
+
+
+def test_projection_reads_archived_transcripts(db, videos):
+    db.archive_published_transcripts()
+    video = db.list_videos(after_id=2, limit=1, columns=("transcript",))[0]
+    assert video == {"id": 3, "transcript": "talk"}
+
+
+def test_endpoint_pages_with_next_after_id(videos, client):
+    ids = []
+    after_id = 0
+    while after_id is not None:
+        body = client.get("/videos", params={"after_id": after_id, "limit": 10, "fields": "video_url"}).json()
+        assert all(set(video) == {"id", "video_url"} for video in body["videos"])
+        assert body["count"] == len(body["videos"])
+        ids.extend(video["id"] for video in body["videos"])
+        after_id = body["next_after_id"]
+    assert ids == list(range(1, 26))
+
+
+def test_endpoint_rejects_unknown_fields(videos, client):
+    response = client.get("/videos", params={"fields": "id,nope"})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("filters, index", [
+    ({"status": "pending"}, "idx_videos_status_id"),
+    ({"status": "pending", "columns": ("transcript",)}, "idx_videos_status_id"),
+    ({"channel_id": 1}, "idx_videos_channel_id_id"),
+])
+def test_filtered_pages_seek_an_index(db, filters, index):
+    sql, params = db.video_page_query(after_id=0, limit=100, **filters)
+    with db.get_db() as conn:
+        plan = " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+    assert index in plan
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,279 @@
+# tracing.py
+"""
+Lightweight per-video tracing.
+
+Every video gets a trace ID derived from its URL, so spans recorded in different requests
+(discovery, transcript extraction, generation, posting) land in the same trace without storing
+anything extra on the videos table. Spans are buffered in memory and handed in batches to a
+background writer thread, which stores them in a local SQLite file that the /traces endpoints query.
+"""
+import hashlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+TRACE_DB_PATH = os.getenv("TRACE_DB_PATH", "traces.db")
+TRACE_BATCH_SIZE = int(os.getenv("TRACE_BATCH_SIZE", 50))
+TRACE_FLUSH_INTERVAL = float(os.getenv("TRACE_FLUSH_INTERVAL", 2.0))
+# Retention: spans older than TRACE_MAX_AGE_DAYS, and the oldest beyond TRACE_MAX_SPANS, are deleted
+# every TRACE_PRUNE_EVERY exported spans (0 disables either limit)
+TRACE_MAX_AGE_DAYS = float(os.getenv("TRACE_MAX_AGE_DAYS", 14))
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", 1000000))
+TRACE_PRUNE_EVERY = int(os.getenv("TRACE_PRUNE_EVERY", 1000))
+
+# (trace_id, span_id) of the innermost active span, or None
+_current = ContextVar("current_span", default=None)
+
+
+def trace_id_for_video(video_url):
+    """Stable 128-bit trace ID for a video URL."""
+    return hashlib.sha256(video_url.encode("utf-8")).hexdigest()[:32]
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_time", "duration_ms", "status", "attributes")
+
+    def __init__(self, trace_id, parent_id, name, attributes):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.start_time = time.time()
+        self.duration_ms = None
+        self.status = "ok"
+        self.attributes = attributes
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def mark_error(self, message=None):
+        self.status = "error"
+        if message:
+            self.attributes["error"] = str(message)[:500]
+
+
+class SQLiteSpanExporter:
+    """Buffers finished spans and writes them to SQLite in batches on a background thread."""
+
+    def __init__(self, db_path, batch_size=50, flush_interval=2.0, max_age_days=14, max_spans=1000000,
+                 prune_every=1000):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_age_days = max_age_days
+        self.max_spans = max_spans
+        self.prune_every = prune_every
+        self._exported_since_prune = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._initialized = False
+        self._queue = queue.SimpleQueue()
+        self._writer = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        if not self._initialized:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS spans (
+                    span_id TEXT PRIMARY KEY,
+                    trace_id TEXT NOT NULL,
+                    parent_id TEXT,
+                    name TEXT NOT NULL,
+                    start_time REAL NOT NULL,
+                    duration_ms REAL NOT NULL,
+                    status TEXT,
+                    attributes TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_spans_trace_id ON spans (trace_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_spans_name_duration ON spans (name, duration_ms)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_spans_start_time ON spans (start_time)")
+            self._initialized = True
+        return conn
+
+    def export(self, span):
+        with self._lock:
+            self._buffer.append(span)
+            if (len(self._buffer) < self.batch_size
+                    and time.monotonic() - self._last_flush < self.flush_interval):
+                return
+            batch = self._take_batch()
+        # Writing (and pruning) happens on the writer thread, never on the thread that ended the span
+        self._queue.put(batch)
+
+    def flush(self, timeout=30.0):
+        """Hand over the buffered spans and wait until the writer has stored everything queued so far."""
+        with self._lock:
+            batch = self._take_batch()
+        if batch:
+            self._queue.put(batch)
+        done = threading.Event()
+        self._queue.put(done)
+        if not done.wait(timeout):
+            logger.warning("Timed out waiting for the span writer to catch up")
+
+    def _take_batch(self):
+        """Swap out the buffer and make sure the writer thread is running. Called with the lock held."""
+        batch, self._buffer = self._buffer, []
+        self._last_flush = time.monotonic()
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="span-writer", daemon=True)
+            self._writer.start()
+        return batch
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if isinstance(item, threading.Event):
+                item.set()
+            else:
+                self._write(item)
+
+    def _write(self, batch):
+        rows = [
+            (s.span_id, s.trace_id, s.parent_id, s.name, s.start_time, s.duration_ms, s.status,
+             json.dumps(s.attributes, default=str) if s.attributes else None)
+            for s in batch
+        ]
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.executemany("INSERT OR REPLACE INTO spans VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                self._exported_since_prune += len(rows)
+                if self.prune_every and self._exported_since_prune >= self.prune_every:
+                    self._exported_since_prune = 0
+                    self._prune(conn)
+        except Exception as e:
+            # Keep the writer alive; losing a batch of spans is better than losing all later ones
+            logger.error(f"Failed to export {len(rows)} spans: {e}")
+
+    def _prune(self, conn):
+        """Delete spans past the retention age and the oldest ones beyond max_spans."""
+        if self.max_age_days:
+            conn.execute("DELETE FROM spans WHERE start_time < ?", (time.time() - self.max_age_days * 86400,))
+        if self.max_spans:
+            conn.execute(
+                "DELETE FROM spans WHERE start_time < "
+                "(SELECT start_time FROM spans ORDER BY start_time DESC LIMIT 1 OFFSET ?)",
+                (self.max_spans - 1,)
+            )
+
+    def query(self, sql, params=()):
+        self.flush()
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(sql, params).fetchall()]
+        finally:
+            conn.close()
+
+
+exporter = SQLiteSpanExporter(TRACE_DB_PATH, TRACE_BATCH_SIZE, TRACE_FLUSH_INTERVAL, TRACE_MAX_AGE_DAYS,
+                              TRACE_MAX_SPANS, TRACE_PRUNE_EVERY)
+
+
+@contextmanager
+def span(name, trace_id=None, **attributes):
+    """
+    Record a span. Uses the given trace ID, or the currently active trace; without either
+    (e.g. channel-level YouTube pagination) it is a no-op and yields None.
+    """
+    current = _current.get()
+    if trace_id is None and current is not None:
+        trace_id = current[0]
+    if not TRACING_ENABLED or trace_id is None:
+        yield None
+        return
+
+    parent_id = current[1] if current is not None and current[0] == trace_id else None
+    s = Span(trace_id, parent_id, name, attributes)
+    token = _current.set((trace_id, s.span_id))
+    start = time.perf_counter()
+    try:
+        yield s
+    except BaseException as e:
+        s.mark_error(e)
+        raise
+    finally:
+        s.duration_ms = (time.perf_counter() - start) * 1000
+        _current.reset(token)
+        exporter.export(s)
+
+
+@contextmanager
+def trace_video(video_url):
+    """Make the video's trace the active trace for spans opened inside the block."""
+    token = _current.set((trace_id_for_video(video_url), None))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def flush():
+    exporter.flush()
+
+
+def get_trace(trace_id):
+    """All spans of a trace, ordered by start time."""
+    spans = exporter.query(
+        "SELECT * FROM spans WHERE trace_id = ? ORDER BY start_time", (trace_id,)
+    )
+    for s in spans:
+        s["attributes"] = json.loads(s["attributes"]) if s["attributes"] else {}
+    return spans
+
+
+def get_stage_summary():
+    """Per span name: count, errors, average and max duration, slowest first."""
+    return exporter.query("""
+        SELECT name,
+               COUNT(*) AS count,
+               SUM(status = 'error') AS errors,
+               ROUND(AVG(duration_ms), 3) AS avg_ms,
+               ROUND(MAX(duration_ms), 3) AS max_ms,
+               ROUND(SUM(duration_ms), 3) AS total_ms
+        FROM spans
+        GROUP BY name
+        ORDER BY total_ms DESC
+    """)
+
+
+def get_slowest_traces(limit=20, stage=None):
+    """
+    Traces with the longest end-to-end time. `busy_ms` is time spent inside top-level spans;
+    the rest of `end_to_end_ms` was spent waiting, e.g. in the pending backlog.
+    With `stage`, rank by the slowest span of that name instead.
+    """
+    if stage:
+        spans = exporter.query("""
+            SELECT trace_id, span_id, duration_ms, status, start_time, attributes
+            FROM spans WHERE name = ?
+            ORDER BY duration_ms DESC LIMIT ?
+        """, (stage, limit))
+        for s in spans:
+            s["attributes"] = json.loads(s["attributes"]) if s["attributes"] else {}
+        return spans
+    return exporter.query("""
+        SELECT trace_id,
+               MAX(json_extract(attributes, '$.video_url')) AS video_url,
+               COUNT(*) AS spans,
+               MIN(start_time) AS first_start,
+               ROUND((MAX(start_time + duration_ms / 1000.0) - MIN(start_time)) * 1000, 3) AS end_to_end_ms,
+               ROUND(SUM(CASE WHEN parent_id IS NULL THEN duration_ms ELSE 0 END), 3) AS busy_ms,
+               SUM(status = 'error') AS errors
+        FROM spans
+        GROUP BY trace_id
+        ORDER BY end_to_end_ms DESC
+        LIMIT ?
+    """, (limit,))
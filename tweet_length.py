@@ -0,0 +1,176 @@
+# tweet_length.py
+"""
+Local tweet length validation, compatible with twitter-text's weighted counting (config v3).
+
+X does not count characters: text is NFC-normalized, every URL counts as 23, code points in the Latin and
+general punctuation ranges weigh 1 and everything else (CJK, most symbols) weighs 2. An emoji counts as 2
+however many code points it is made of (skin tones, ZWJ sequences, flags, keycaps). Checking this locally
+avoids a failed post (BadRequest) after a full round trip to the API.
+
+URL detection covers scheme and www. URLs and bare domains with common TLDs; twitter-text recognizes a
+few more forms, so keep generated tweets free of unusual bare domains if they must count exactly.
+"""
+import re
+import unicodedata
+
+MAX_WEIGHTED_LENGTH = 280
+URL_LENGTH = 23
+ELLIPSIS = "..."
+MIN_SENTENCE_FILL = 0.5  # a sentence-boundary cut must keep at least this share of the limit
+
+_SCALE = 100
+_DEFAULT_WEIGHT = 200
+_RANGES = ((0, 4351), (8192, 8205), (8208, 8223), (8242, 8247))  # weight 100
+
+_URL_RE = re.compile(
+    r"(?:https?://|www\.)[^\s<>\"]+"
+    r"|\b(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+(?:com|org|net|io|co|ai|dev|app|me|tv|ly|gg|edu|gov|uk|de|fr)"
+    r"(?![a-z0-9-])(?:/[^\s<>\"]*)?",
+    re.IGNORECASE
+)
+_URL_TRAILING = ".,!?;:)]}'\""
+
+_ZWJ = 0x200D
+_VS16 = 0xFE0F
+_KEYCAP = 0x20E3
+# Capturing, so the whitespace (line breaks included) between the pieces is kept when they are joined back
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])(\s+)")
+_WHITESPACE_RE = re.compile(r"(\s+)")
+
+
+def _is_emoji_base(cp):
+    return (
+        0x1F000 <= cp <= 0x1FAFF      # emoticons, pictographs, transport, supplemental symbols, flags
+        or 0x2600 <= cp <= 0x27BF     # miscellaneous symbols and dingbats
+        or 0x2B00 <= cp <= 0x2BFF     # arrows, stars and squares used as emoji
+        or cp in (0x00A9, 0x00AE, 0x203C, 0x2049, 0x2122, 0x2139, 0x2328, 0x23CF, 0x3030, 0x303D)
+        or 0x2190 <= cp <= 0x21FF
+        or 0x231A <= cp <= 0x23FF
+    )
+
+
+def _is_emoji_modifier(cp):
+    # Skin tones, variation selector 16 and tag characters (subdivision flags) weigh nothing
+    return 0x1F3FB <= cp <= 0x1F3FF or cp == _VS16 or 0xE0020 <= cp <= 0xE007F
+
+
+def _char_weight(cp):
+    for start, end in _RANGES:
+        if start <= cp <= end:
+            return _SCALE
+    return _DEFAULT_WEIGHT
+
+
+def _text_weight(text):
+    """Weight (x100) of text without URLs."""
+    codepoints = [ord(c) for c in text]
+    weight = 0
+    i = 0
+    n = len(codepoints)
+    while i < n:
+        cp = codepoints[i]
+        keycap = i + 1 < n and (codepoints[i + 1] == _KEYCAP or
+                                (codepoints[i + 1] == _VS16 and i + 2 < n and codepoints[i + 2] == _KEYCAP))
+        if keycap and (cp in (0x23, 0x2A) or 0x30 <= cp <= 0x39):
+            # Keycap sequence, e.g. 1️⃣
+            weight += _DEFAULT_WEIGHT
+            i += 3 if codepoints[i + 1] == _VS16 else 2
+            continue
+        if 0x1F1E6 <= cp <= 0x1F1FF:
+            # Regional indicator pair (flag) is one emoji
+            weight += _DEFAULT_WEIGHT
+            i += 2 if i + 1 < n and 0x1F1E6 <= codepoints[i + 1] <= 0x1F1FF else 1
+            continue
+        if _is_emoji_base(cp) and (cp > 0xFFFF or (i + 1 < n and codepoints[i + 1] == _VS16) or cp >= 0x2600):
+            weight += _DEFAULT_WEIGHT
+            i += 1
+            # Modifiers and ZWJ-joined parts belong to the same emoji
+            while i < n:
+                if _is_emoji_modifier(codepoints[i]):
+                    i += 1
+                elif codepoints[i] == _ZWJ and i + 1 < n:
+                    i += 2
+                else:
+                    break
+            continue
+        weight += _char_weight(cp)
+        i += 1
+    return weight
+
+
+def _find_urls(text):
+    for match in _URL_RE.finditer(text):
+        start, end = match.span()
+        while end > start and text[end - 1] in _URL_TRAILING:
+            end -= 1
+        yield start, end
+
+
+def weighted_length(text):
+    """Length of `text` as X counts it, after NFC normalization."""
+    text = unicodedata.normalize("NFC", text)
+    weight = 0
+    position = 0
+    for start, end in _find_urls(text):
+        weight += _text_weight(text[position:start]) + URL_LENGTH * _SCALE
+        position = end
+    weight += _text_weight(text[position:])
+    return weight // _SCALE
+
+
+def is_valid(text, max_length=MAX_WEIGHTED_LENGTH):
+    return bool(text and text.strip()) and weighted_length(text) <= max_length
+
+
+def fit_at_sentence(text, max_length=MAX_WEIGHTED_LENGTH, min_fill=MIN_SENTENCE_FILL):
+    """
+    Longest run of whole leading sentences that fits, or None if it would keep less than `min_fill`
+    of the limit (e.g. only a short first sentence).
+    """
+    text = unicodedata.normalize("NFC", text).strip()
+    # Sentences at even indexes, the whitespace after each at odd ones
+    parts = _SENTENCE_END_RE.split(text)
+    fitted = None
+    for end in range(1, len(parts) + 1, 2):
+        candidate = "".join(parts[:end])
+        if weighted_length(candidate) > max_length:
+            break
+        fitted = candidate
+    if fitted is None or weighted_length(fitted) < max_length * min_fill:
+        return None
+    return fitted
+
+
+def fit_at_word(text, max_length=MAX_WEIGHTED_LENGTH):
+    """Cut at the last whole word (URLs are never split) that leaves room for an ellipsis."""
+    text = unicodedata.normalize("NFC", text).strip()
+    if weighted_length(text) <= max_length:
+        return text
+    budget = max_length - weighted_length(ELLIPSIS)
+    # Words at even indexes, the whitespace between them at odd ones
+    parts = _WHITESPACE_RE.split(text)
+    fitted = ""
+    for end in range(1, len(parts) + 1, 2):
+        candidate = "".join(parts[:end])
+        if weighted_length(candidate) > budget:
+            break
+        fitted = candidate
+    if not fitted:
+        # No whitespace to cut at (e.g. CJK text): cut between characters
+        for end in range(len(text), 0, -1):
+            if weighted_length(text[:end]) <= budget:
+                fitted = text[:end]
+                break
+    fitted = fitted.rstrip(",;:-\u2013\u2014 ")
+    return f"{fitted}{ELLIPSIS}" if fitted else ""
+
+
+def repair(text, max_length=MAX_WEIGHTED_LENGTH):
+    """
+    Return `text` normalized and shortened to fit: at a sentence boundary if that keeps at least
+    MIN_SENTENCE_FILL of the limit, otherwise at a word boundary with an ellipsis.
+    """
+    text = unicodedata.normalize("NFC", text or "").strip()
+    if weighted_length(text) <= max_length:
+        return text
+    return fit_at_sentence(text, max_length) or fit_at_word(text, max_length)
@@ -1,118 +1,236 @@
 # x_handler.py
 import os
 import logging
-import tweepy
+import requests
 import time
 
+import clients
+import resilience
+import tracing
+from metrics import track_external_call
+
 logger = logging.getLogger(__name__)
 
+clients.load_env()
+
 X_API_KEY = os.getenv("X_API_KEY")
 X_API_SECRET = os.getenv("X_API_SECRET")
 X_ACCESS_TOKEN = os.getenv("X_ACCESS_TOKEN")
 X_ACCESS_TOKEN_SECRET = os.getenv("X_ACCESS_TOKEN_SECRET")
 
+# Optional overrides, e.g. to point at a local stand-in server
+X_API_BASE_URL = os.getenv("X_API_BASE_URL")
+X_UPLOAD_BASE_URL = os.getenv("X_UPLOAD_BASE_URL", X_API_BASE_URL)
+
+# Used when X does not report expires_after_secs for an upload
+X_MEDIA_DEFAULT_TTL = 86400
+
+X_DEFAULT_API_HOST = "https://api.twitter.com"
+X_DEFAULT_UPLOAD_HOST = "https://upload.twitter.com"
+
+
+def _rebase_session(session):
+    """
+    Tweepy hardcodes the X hosts, so rewrite request URLs on its session when base URL overrides are set.
+    """
+    if not (X_API_BASE_URL or X_UPLOAD_BASE_URL):
+        return
+    rewrites = [
+        (X_DEFAULT_API_HOST, X_API_BASE_URL),
+        (X_DEFAULT_UPLOAD_HOST, X_UPLOAD_BASE_URL),
+    ]
+    original_request = session.request
+
+    def request(method, url, *args, **kwargs):
+        for default_host, base_url in rewrites:
+            if base_url and url.startswith(default_host):
+                url = base_url.rstrip('/') + url[len(default_host):]
+                break
+        return original_request(method, url, *args, **kwargs)
+
+    session.request = request
+
+
+def _build_api_v1():
+    # tweepy is imported on first use so importing the app stays fast
+    import tweepy
+    # Auth for v1.1 (media upload)
+    auth = tweepy.OAuth1UserHandler(
+        X_API_KEY, X_API_SECRET, X_ACCESS_TOKEN, X_ACCESS_TOKEN_SECRET
+    )
+    api_v1 = tweepy.API(auth, wait_on_rate_limit=False)
+    _rebase_session(api_v1.session)
+    return api_v1
+
+
+def _build_client():
+    import tweepy
+    # Auth for v2 (tweet posting)
+    client = tweepy.Client(
+        consumer_key=X_API_KEY,
+        consumer_secret=X_API_SECRET,
+        access_token=X_ACCESS_TOKEN,
+        access_token_secret=X_ACCESS_TOKEN_SECRET,
+        wait_on_rate_limit=False
+    )
+    _rebase_session(client.session)
+    return client
+
+
+clients.register("x_api_v1", _build_api_v1)
+clients.register("x_client", _build_client)
+
+
+def _is_retryable_error(e):
+    import tweepy
+    return isinstance(e, (
+        tweepy.TooManyRequests,
+        tweepy.TwitterServerError,
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+    ))
+
+
+def _is_retryable_post_error(e):
+    """
+    Retry predicate for creating a tweet, which is not idempotent: a read timeout or a dropped connection
+    after the request was sent may have posted it already, so only errors X answered with and connection
+    failures before anything was sent are retried.
+    """
+    import tweepy
+    from urllib3.exceptions import NewConnectionError
+    if isinstance(e, (tweepy.TooManyRequests, tweepy.TwitterServerError, requests.exceptions.ConnectTimeout)):
+        return True
+    if isinstance(e, requests.exceptions.ConnectionError) and not isinstance(e, requests.exceptions.Timeout):
+        reason = getattr(e.args[0], "reason", None) if e.args else None
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
+def _upload_media(api_v1, media_path):
+    with track_external_call("x", "media_upload"), tracing.span("x.media_upload"):
+        # Chunked upload (INIT/APPEND/FINALIZE), so large files don't fail on the simple upload limit
+        return api_v1.media_upload(media_path, chunked=True, media_category="tweet_image")
+
+
+def upload_media(media_path):
+    """
+    Upload an image ahead of posting, so the tweet only needs to attach its ID.
+    Returns {"media_id": ..., "expires_at": unix seconds}, or None if X rejected the upload.
+
+    Raises:
+        resilience.ServiceUnavailable: X is rate limiting or failing, or its circuit is open.
+    """
+    if not all([X_API_KEY, X_API_SECRET, X_ACCESS_TOKEN, X_ACCESS_TOKEN_SECRET]):
+        logger.error("Missing X (Twitter) API credentials in environment variables.")
+        return None
+
+    import tweepy
+
+    try:
+        api_v1 = clients.get("x_api_v1")
+        media = resilience.call("x", _upload_media, api_v1, media_path, is_retryable=_is_retryable_error)
+    except resilience.ServiceUnavailable:
+        raise
+    except tweepy.TweepyException as e:
+        logger.error(f"Media upload failed: {e}")
+        return None
+    expires_after = getattr(media, 'expires_after_secs', None) or X_MEDIA_DEFAULT_TTL
+    logger.info(f"Uploaded media {media.media_id_string} from {media_path}")
+    return {"media_id": media.media_id_string, "expires_at": int(time.time()) + int(expires_after)}
+
 
-def post_tweet(text, media_path=None):
+def _create_tweet(client, text, media_ids):
+    with track_external_call("x", "create_tweet"), tracing.span("x.create_tweet"):
+        if media_ids:
+            return client.create_tweet(text=text, media_ids=media_ids)
+        return client.create_tweet(text=text)
+
+
+def post_tweet(text, media_path=None, media_id=None):
     """
     Post a tweet to X (Twitter) using Tweepy (v1.1 for media, v2 for text-only).
-    Handles rate limits and prints all possible error reasons clearly.
-    Returns True if successful, False otherwise.
+    `media_id` attaches media uploaded earlier with upload_media(); `media_path` uploads a file first.
+    Retries rate limits and server errors through the shared resilience layer and logs all
+    other error reasons clearly.
+    Returns True if successful, False if X rejected the tweet.
+
+    Raises:
+        resilience.ServiceUnavailable: X is rate limiting or failing, or its circuit is open.
+            The tweet was not posted and can be retried later.
     """
     logger.info(f"Posting tweet: {text[:50]}...")
     if not all([X_API_KEY, X_API_SECRET, X_ACCESS_TOKEN, X_ACCESS_TOKEN_SECRET]):
         logger.error("Missing X (Twitter) API credentials in environment variables.")
-        print("Missing X (Twitter) API credentials in environment variables.")
         return False
 
-    try:
-        # Auth for v1.1 (media upload)
-        auth = tweepy.OAuth1UserHandler(
-            X_API_KEY, X_API_SECRET, X_ACCESS_TOKEN, X_ACCESS_TOKEN_SECRET
-        )
-        api_v1 = tweepy.API(auth, wait_on_rate_limit=True)
-
-        # Auth for v2 (tweet posting)
-        client = tweepy.Client(
-            consumer_key=X_API_KEY,
-            consumer_secret=X_API_SECRET,
-            access_token=X_ACCESS_TOKEN,
-            access_token_secret=X_ACCESS_TOKEN_SECRET,
-            wait_on_rate_limit=True
-        )
+    import tweepy
 
+    try:
         media_ids = []
-        if media_path:
+        if media_id:
+            media_ids.append(media_id)
+        elif media_path:
             try:
-                media = api_v1.media_upload(media_path)
+                api_v1 = clients.get("x_api_v1")
+                media = resilience.call("x", _upload_media, api_v1, media_path, is_retryable=_is_retryable_error)
                 media_ids.append(media.media_id_string)
                 logger.info(f"Uploaded media: {media_path}")
             except tweepy.TweepyException as e:
                 logger.error(f"Media upload failed: {e}")
-                print(f"Media upload failed: {e}")
                 return False
 
         # Post tweet
         try:
-            if media_ids:
-                response = client.create_tweet(text=text, media_ids=media_ids)
-            else:
-                response = client.create_tweet(text=text)
-        except tweepy.TooManyRequests as e:
-            logger.error(f"Rate limit exceeded: {e}")
-            print("Rate limit exceeded. Please wait and try again.")
-            return False
+            client = clients.get("x_client")
+            response = resilience.call(
+                "x", _create_tweet, client, text, media_ids, is_retryable=_is_retryable_post_error
+            )
+        except resilience.ServiceUnavailable:
+            raise
         except tweepy.Unauthorized as e:
             logger.error(f"Authentication failed: {e}")
-            print("Authentication failed. Check your X API credentials.")
             return False
         except tweepy.Forbidden as e:
             logger.error(f"Forbidden: {e}")
-            print(f"Forbidden: {e}")
             return False
         except tweepy.BadRequest as e:
             logger.error(f"Bad request: {e}")
-            print(f"Bad request: {e}")
             return False
         except tweepy.TweepyException as e:
             logger.error(f"Tweepy error: {e}")
-            print(f"Tweepy error: {e}")
+            return False
+        except requests.exceptions.RequestException as e:
+            # Not retried: the request may have reached X, so the tweet may or may not be posted
+            logger.error(f"Request to X failed after sending, tweet may have been posted: {e}")
             return False
         except Exception as e:
             logger.error(f"Unknown error posting tweet: {e}")
-            print(f"Unknown error posting tweet: {e}")
             return False
 
         # Success check
         if hasattr(response, 'data') and response.data and 'id' in response.data:
             logger.info(f"Successfully posted tweet: {response.data['id']}")
-            print(f"Successfully posted tweet: {response.data['id']}")
             return True
         else:
             logger.error("Failed to post tweet - no response data")
-            print("Failed to post tweet - no response data")
             return False
 
-    except tweepy.TooManyRequests as e:
-        logger.error(f"Rate limit exceeded: {e}")
-        print("Rate limit exceeded. Please wait and try again.")
-        return False
+    except resilience.ServiceUnavailable as e:
+        logger.error(f"X unavailable, tweet not posted: {e}")
+        raise
     except tweepy.Unauthorized as e:
         logger.error(f"Authentication failed: {e}")
-        print("Authentication failed. Check your X API credentials.")
         return False
     except tweepy.Forbidden as e:
         logger.error(f"Forbidden: {e}")
-        print(f"Forbidden: {e}")
         return False
     except tweepy.BadRequest as e:
         logger.error(f"Bad request: {e}")
-        print(f"Bad request: {e}")
         return False
     except tweepy.TweepyException as e:
         logger.error(f"Tweepy error: {e}")
-        print(f"Tweepy error: {e}")
         return False
     except Exception as e:
         logger.error(f"Unknown error posting tweet: {e}")
-        print(f"Unknown error posting tweet: {e}")
         return False
\ No newline at end of file
@@ -4,18 +4,26 @@ import os
 import requests
 import re
 
-from dotenv import load_dotenv
-
+import clients
+import resilience
+import tracing
+from metrics import track_external_call, record_cache_lookup
 from youtube_channel_video_extractor import YouTubePlaylistExtractor
 
 logger = logging.getLogger(__name__)
 
-load_dotenv()
+clients.load_env()
 
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 SUPADATA_API_KEY = os.getenv("SUPADATA_API_KEY")
+SUPADATA_BASE_URL = os.getenv("SUPADATA_BASE_URL", "https://api.supadata.ai/v1").rstrip('/')
+SUPADATA_TIMEOUT = (3.05, float(os.getenv("SUPADATA_TIMEOUT", 15)))  # (connect, read) seconds
+THUMBNAIL_BASE_URL = os.getenv("THUMBNAIL_BASE_URL", "https://i.ytimg.com").rstrip('/')
+THUMBNAIL_CACHE_DIR = os.getenv("THUMBNAIL_CACHE_DIR", "thumbnails")
+# Tried in order; maxresdefault is missing for some videos, hqdefault always exists
+THUMBNAIL_NAMES = ("maxresdefault", "hqdefault")
 
-youtube_extractor = YouTubePlaylistExtractor(YOUTUBE_API_KEY)
+clients.register("youtube", lambda: YouTubePlaylistExtractor(YOUTUBE_API_KEY))
 
 
 def extract_transcript(video_url):
@@ -27,29 +35,100 @@ def extract_transcript(video_url):
     if not SUPADATA_API_KEY:
         logger.error("SUPADATA_API_KEY not set in environment.")
         return None
-    # Extract videoId from URL
-    match = re.search(r"[?&]v=([\w-]+)", video_url)
-    if not match:
+    video_id = get_video_id(video_url)
+    if not video_id:
         logger.error(f"Could not extract videoId from URL: {video_url}")
         return None
-    video_id = match.group(1)
-    url = f"https://api.supadata.ai/v1/youtube/transcript?videoId={video_id}"
+    url = f"{SUPADATA_BASE_URL}/youtube/transcript?videoId={video_id}"
     headers = {"x-api-key": SUPADATA_API_KEY}
     try:
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
+        response = resilience.call(
+            "supadata", _fetch_transcript, url, headers, video_id,
+            is_retryable=resilience.is_transient_requests_error
+        )
         data = response.json()
-        print(f"response data={data}")
+        logger.debug("Supadata response for videoId %s: %s segments", video_id, len(data.get('content', [])))
         transcript = extract_transcript_from_supadata_response(data)
         if not transcript:
             logger.error(f"No transcript found in response for videoId {video_id}")
             return None
         return transcript
+    except resilience.ServiceUnavailable as e:
+        logger.warning(f"Skipping transcript for videoId {video_id}: {e}")
+        return None
     except Exception as e:
         logger.error(f"Error fetching transcript for videoId {video_id}: {e}")
         return None
 
 
+def get_video_id(video_url):
+    """Return the videoId of a watch URL, or None."""
+    match = re.search(r"[?&]v=([\w-]+)", video_url)
+    return match.group(1) if match else None
+
+
+def fetch_thumbnail(video_url):
+    """
+    Return the local path of the video's thumbnail, downloading it into THUMBNAIL_CACHE_DIR on first use.
+    Returns None if the thumbnail is unavailable.
+    """
+    video_id = get_video_id(video_url)
+    if not video_id:
+        logger.error(f"Could not extract videoId from URL: {video_url}")
+        return None
+    path = os.path.join(THUMBNAIL_CACHE_DIR, f"{video_id}.jpg")
+    cached = os.path.exists(path)
+    record_cache_lookup("thumbnail", cached)
+    if cached:
+        return path
+
+    for name in THUMBNAIL_NAMES:
+        url = f"{THUMBNAIL_BASE_URL}/vi/{video_id}/{name}.jpg"
+        try:
+            response = resilience.call(
+                "ytimg", _fetch_thumbnail, url, video_id,
+                is_retryable=resilience.is_transient_requests_error
+            )
+        except resilience.ServiceUnavailable as e:
+            logger.warning(f"Skipping thumbnail for videoId {video_id}: {e}")
+            return None
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error fetching thumbnail for videoId {video_id}: {e}")
+            return None
+        if response.status_code == 404:
+            continue
+        if response.status_code != 200:
+            logger.error(f"Error fetching thumbnail for videoId {video_id}: HTTP {response.status_code}")
+            return None
+        os.makedirs(THUMBNAIL_CACHE_DIR, exist_ok=True)
+        # Write then rename, so a concurrent reader never sees a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(response.content)
+        os.replace(tmp_path, path)
+        return path
+
+    logger.warning(f"No thumbnail found for videoId {video_id}")
+    return None
+
+
+def _fetch_thumbnail(url, video_id):
+    with track_external_call("ytimg", "thumbnail") as call, tracing.span("ytimg.thumbnail", video_id=video_id):
+        response = requests.get(url, timeout=(3.05, 15))
+        if response.status_code >= 400 and response.status_code != 404:
+            call.mark_error()
+            if resilience.is_transient_status(response.status_code):
+                response.raise_for_status()
+        return response
+
+
+def _fetch_transcript(url, headers, video_id):
+    with track_external_call("supadata", "transcript"), tracing.span("supadata.transcript", video_id=video_id):
+        response = requests.get(url, headers=headers, timeout=SUPADATA_TIMEOUT)
+        response.raise_for_status()
+        return response
+
+
 def extract_transcript_from_supadata_response(response_json):
     """
     Given a Supadata API response (parsed JSON), return the full transcript as a single string.
@@ -1,13 +1,52 @@
 # youtube_channel_video_extractor.py
+import logging
+import os
 import requests
 import time
 from typing import List, Dict, Optional
 
+import resilience
+import tracing
+from metrics import track_external_call, record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_YOUTUBE_API_BASE_URL = "https://www.googleapis.com/youtube/v3"
+
 
 class YouTubePlaylistExtractor:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, base_url: Optional[str] = None, request_delay: Optional[float] = None):
         self.api_key = api_key
-        self.base_url = "https://www.googleapis.com/youtube/v3"
+        self.base_url = (base_url or os.getenv("YOUTUBE_API_BASE_URL") or DEFAULT_YOUTUBE_API_BASE_URL).rstrip('/')
+        # Delay between paginated calls to respect API rate limits
+        if request_delay is None:
+            request_delay = float(os.getenv("YOUTUBE_REQUEST_DELAY", 0.1))
+        self.request_delay = request_delay
+        # Resolved channel IDs by channel URL; handles rarely change, so scans skip the lookup call
+        self._channel_id_cache: Dict[str, str] = {}
+
+    def _get(self, url: str, params: Dict) -> requests.Response:
+        """
+        GET a YouTube Data API endpoint through the shared circuit breaker, retrying transient failures.
+        Non-transient error responses are returned for the caller's raise_for_status().
+
+        Raises:
+            resilience.ServiceUnavailable: YouTube is failing or its circuit is open
+        """
+        return resilience.call(
+            "youtube", self._get_once, url, params,
+            is_retryable=resilience.is_transient_requests_error
+        )
+
+    def _get_once(self, url: str, params: Dict) -> requests.Response:
+        operation = url.rsplit('/', 1)[-1]
+        with track_external_call("youtube", operation) as call, tracing.span(f"youtube.{operation}"):
+            response = requests.get(url, params=params, timeout=(3.05, 30))
+            if response.status_code >= 400:
+                call.mark_error()
+                if resilience.is_transient_status(response.status_code):
+                    response.raise_for_status()
+            return response
 
     def get_playlist_videos(self, playlist_id: str, max_results: int = 50) -> List[str]:
         """
@@ -36,7 +75,7 @@ class YouTubePlaylistExtractor:
                 params["pageToken"] = next_page_token
 
             try:
-                response = requests.get(url, params=params)
+                response = self._get(url, params)
                 response.raise_for_status()
                 data = response.json()
 
@@ -52,13 +91,13 @@ class YouTubePlaylistExtractor:
                     break
 
                 # Add small delay to respect API rate limits
-                time.sleep(0.1)
+                time.sleep(self.request_delay)
 
             except requests.exceptions.RequestException as e:
-                print(f"Error fetching playlist {playlist_id}: {e}")
+                logger.error(f"Error fetching playlist {playlist_id}: {e}")
                 break
             except KeyError as e:
-                print(f"Unexpected response format for playlist {playlist_id}: {e}")
+                logger.error(f"Unexpected response format for playlist {playlist_id}: {e}")
                 break
 
         return video_urls
@@ -89,7 +128,7 @@ class YouTubePlaylistExtractor:
                 params["pageToken"] = next_page_token
 
             try:
-                response = requests.get(url, params=params)
+                response = self._get(url, params)
                 response.raise_for_status()
                 data = response.json()
 
@@ -106,10 +145,10 @@ class YouTubePlaylistExtractor:
                 if not next_page_token:
                     break
 
-                time.sleep(0.1)
+                time.sleep(self.request_delay)
 
             except requests.exceptions.RequestException as e:
-                print(f"Error fetching playlists for channel {channel_id}: {e}")
+                logger.error(f"Error fetching playlists for channel {channel_id}: {e}")
                 break
 
         return playlists
@@ -130,25 +169,25 @@ class YouTubePlaylistExtractor:
         playlists = self.get_channel_playlists(channel_id)
 
         if not playlists:
-            print(f"No playlists found for channel {channel_id}")
+            logger.warning(f"No playlists found for channel {channel_id}")
             return all_videos
 
-        print(f"Found {len(playlists)} playlists in channel")
+        logger.info(f"Found {len(playlists)} playlists in channel")
 
         # Get videos from each playlist
         for playlist in playlists:
             playlist_id = playlist['id']
             playlist_title = playlist['title']
 
-            print(f"Processing playlist: {playlist_title}")
+            logger.info(f"Processing playlist: {playlist_title}")
 
             videos = self.get_playlist_videos(playlist_id)
             all_videos[playlist_title] = videos
 
-            print(f"Found {len(videos)} videos in '{playlist_title}'")
+            logger.info(f"Found {len(videos)} videos in '{playlist_title}'")
 
             # Add delay between playlists to respect rate limits
-            time.sleep(0.2)
+            time.sleep(self.request_delay * 2)
 
         return all_videos
 
@@ -162,8 +201,17 @@ class YouTubePlaylistExtractor:
         Returns:
             Channel ID or None if not found
         """
-        import re
+        cached = self._channel_id_cache.get(channel_url)
+        record_cache_lookup("channel_id", cached is not None)
+        if cached:
+            return cached
 
+        channel_id = self._resolve_channel_id(channel_url)
+        if channel_id:
+            self._channel_id_cache[channel_url] = channel_id
+        return channel_id
+
+    def _resolve_channel_id(self, channel_url: str) -> Optional[str]:
         # Handle different URL formats
         if '@' in channel_url:
             # Format: https://www.youtube.com/@username
@@ -181,7 +229,7 @@ class YouTubePlaylistExtractor:
             username = channel_url.split('/user/')[-1].split('/')[0]
             return self.get_channel_id_from_username(username)
         else:
-            print(f"Unsupported URL format: {channel_url}")
+            logger.error(f"Unsupported URL format: {channel_url}")
             return None
 
     def get_channel_id_from_username(self, username: str) -> Optional[str]:
@@ -194,18 +242,18 @@ class YouTubePlaylistExtractor:
         }
 
         try:
-            response = requests.get(url, params=params)
+            response = self._get(url, params)
             response.raise_for_status()
             data = response.json()
 
             if data.get('items'):
                 return data['items'][0]['id']
             else:
-                print(f"Channel not found for username: {username}")
+                logger.warning(f"Channel not found for username: {username}")
                 return None
 
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching channel ID for username {username}: {e}")
+            logger.error(f"Error fetching channel ID for username {username}: {e}")
             return None
 
     def get_channel_id_from_custom_name(self, custom_name: str) -> Optional[str]:
@@ -218,18 +266,18 @@ class YouTubePlaylistExtractor:
         }
 
         try:
-            response = requests.get(url, params=params)
+            response = self._get(url, params)
             response.raise_for_status()
             data = response.json()
 
             if data.get('items'):
                 return data['items'][0]['id']
             else:
-                print(f"Channel not found for custom name: {custom_name}")
+                logger.warning(f"Channel not found for custom name: {custom_name}")
                 return None
 
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching channel ID for custom name {custom_name}: {e}")
+            logger.error(f"Error fetching channel ID for custom name {custom_name}: {e}")
             return None
 
     def get_all_videos_from_channel(self, channel_id: str) -> List[str]:
@@ -251,28 +299,64 @@ class YouTubePlaylistExtractor:
         }
 
         try:
-            response = requests.get(url, params=params)
+            response = self._get(url, params)
             response.raise_for_status()
             data = response.json()
 
             if not data.get('items'):
-                print(f"Channel not found: {channel_id}")
+                logger.warning(f"Channel not found: {channel_id}")
                 return []
 
             # Get uploads playlist ID
             uploads_playlist_id = data['items'][0]['contentDetails']['relatedPlaylists']['uploads']
 
             # Get all videos from uploads playlist
-            print(f"Getting all videos from uploads playlist: {uploads_playlist_id}")
+            logger.info(f"Getting all videos from uploads playlist: {uploads_playlist_id}")
             return self.get_playlist_videos(uploads_playlist_id)
 
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching channel details for {channel_id}: {e}")
+            logger.error(f"Error fetching channel details for {channel_id}: {e}")
             return []
         except KeyError as e:
-            print(f"Unexpected response format for channel {channel_id}: {e}")
+            logger.error(f"Unexpected response format for channel {channel_id}: {e}")
             return []
 
+    def get_uploads_playlist_ids(self, channel_ids: List[str]) -> Dict[str, str]:
+        """
+        Get the uploads playlist ID of many channels, batching up to 50 IDs per channels.list call
+
+        Args:
+            channel_ids: YouTube channel IDs
+
+        Returns:
+            Dictionary mapping channel ID to uploads playlist ID (channels not found are omitted)
+        """
+        uploads = {}
+        url = f"{self.base_url}/channels"
+        for start in range(0, len(channel_ids), 50):
+            batch = channel_ids[start:start + 50]
+            params = {
+                "part": "contentDetails",
+                "id": ",".join(batch),
+                "maxResults": 50,
+                "key": self.api_key
+            }
+
+            try:
+                response = self._get(url, params)
+                response.raise_for_status()
+                data = response.json()
+
+                for item in data.get('items', []):
+                    uploads[item['id']] = item['contentDetails']['relatedPlaylists']['uploads']
+
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Error fetching channel details for batch starting {batch[0]}: {e}")
+            except KeyError as e:
+                logger.error(f"Unexpected response format for channel batch starting {batch[0]}: {e}")
+
+        return uploads
+
     def get_all_video_URLs(self, channel_url: str) -> List[str]:
         """
         Get all video URLs from a YouTube channel URL
@@ -283,21 +367,21 @@ class YouTubePlaylistExtractor:
         Returns:
             List of all video URLs from the channel
         """
-        print(f"Processing channel URL: {channel_url}")
+        logger.info(f"Processing channel URL: {channel_url}")
 
         # Extract channel ID from URL
         channel_id = self.get_channel_id_from_url(channel_url)
 
         if not channel_id:
-            print("Could not extract channel ID from URL")
+            logger.error("Could not extract channel ID from URL")
             return []
 
-        print(f"Found channel ID: {channel_id}")
+        logger.info(f"Found channel ID: {channel_id}")
 
         # Get all videos from the channel
         videos = self.get_all_videos_from_channel(channel_id)
 
-        print(f"Found {len(videos)} total videos in channel")
+        logger.info(f"Found {len(videos)} total videos in channel")
 
         return videos
 
@@ -306,7 +390,7 @@ class YouTubePlaylistExtractor:
         with open(filename, 'w', encoding='utf-8') as f:
             for url in urls:
                 f.write(url + '\n')
-        print(f"Saved {len(urls)} URLs to {filename}")
+        logger.info(f"Saved {len(urls)} URLs to {filename}")
 
 
 # Example usage